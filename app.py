@@ -14,101 +14,225 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import os, requests, json, time, yaml, traceback
-from datetime import datetime, timedelta
-from ratelimit import limits, sleep_and_retry
+import argparse, asyncio, atexit, time, yaml, traceback
+from capture import ChangeCapture
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from issues import ISSUE_FIELDS, IssueRecord, decode_page
+from lock import InstanceLock
+from metrics import (
+    count_items,
+    cycle_succeeded,
+    observe_phase,
+    phase,
+    serve,
+    timed_write,
+)
+from partition import RosterPartitioner
+from pipeline import fetch_cycle_inputs, run_writes
+from profiler import CycleProfiler
+from ratebudget import bucket_for, buckets, send
+from reconcile import Reconciler, is_resolved, jira_assignee, motion_priority
+from reporter import ErrorReporter
+from runner import find_target, supervise, target_config
+from scheduler import CycleScheduler
+from sessions import build_session, session_from_config, session_stats
+from state import SyncState, fingerprint
+from task_index import index_issues_by_key, is_jira_task, jira_key_for_task
+from users import UserDirectory
 from variables import assignees
-
-
-def check_running():
-    try:
-        lock_file = "/tmp/jiraMotionSync.lock"
-
-        if os.path.exists(lock_file):
-            print("The script is already running. Exiting.")
-            exit(0)
-        else:
-            with open(lock_file, "w") as file:
-                file.write(str(os.getpid()))
-    except Exception as e:
-        traceback_message = traceback.format_exc()
-        error_report(
-            traceback.extract_stack()[-2].name,
-            f"An error occurred in 'check_running' function: {e}\n{traceback_message}",
-        )
-        print(f"An error occurred in 'check_running' function: {e}")
+from webhook import WebhookReceiver
+from writequeue import WriteQueue
+
+CLOSED_STATUSES = [
+    "Done",
+    "On Hold",
+    "Complete",
+    "Closed",
+    "Resolved",
+    "Backlog",
+    "Withdrawn",
+    "Denied",
+]
+
+latest_snapshot = None
+reporter = None
+partitioner = None
+capture = None
+lock_file = "/tmp/jiraMotionSync.lock"
+instance_lock = None
+
+
+def acquire_lock(sync_config):
+    global instance_lock
+
+    instance_lock = InstanceLock(
+        sync_config.get("lock_file", lock_file), sync_config.get("standby", False)
+    )
+    if not instance_lock.acquire():
+        exit(0)
 
 
 def error_report(function, message):
-    url = config["jira-log-api"]
-    params = {
-        "app": "Jira/Motion Sync",
-        "level": "ERR",
-        "function": function,
-        "msg": str(message),
-    }
-
-    response = requests.get(url, params=params)
+    if reporter is not None:
+        reporter.report(function, message)
 
 
 class JiraClient:
-    def __init__(self, api_url, auth):
+    def __init__(
+        self, api_url, auth, rate_limit=100, session=None, fields=ISSUE_FIELDS
+    ):
         self.api_url = api_url
         self.auth = auth
+        self.fields = fields
+        self.budget = bucket_for(auth, "jira", rate_limit)
+        self.session = session if session is not None else build_session()
+
+    def connection_stats(self):
+        return session_stats(self.session)
+
+    def fetch_page(self, jql_query, start_at=0, max_results=100, **params):
+        headers = {"Accept": "application/json"}
+        query = {"jql": jql_query, "startAt": start_at, "maxResults": max_results}
+        if self.fields:
+            query["fields"] = ",".join(self.fields)
+        query.update(params)
+        response = send(
+            self.budget,
+            self.session.get,
+            self.api_url,
+            headers=headers,
+            params=query,
+            auth=self.auth,
+        )
+        response.raise_for_status()
+        return decode_page(response.content)
 
-    def fetch_issues(self, jql_query):
+    def iter_issues(self, jql_query, page_size=100, **params):
+        start_at = 0
+        while True:
+            page = self.fetch_page(jql_query, start_at, page_size, **params)
+            issues = page.get("issues", [])
+
+            for issue in issues:
+                yield issue
+
+            start_at += len(issues)
+            if not issues or start_at >= page.get("total", 0):
+                return
+
+    def fetch_user_emails(self, account_ids, batch_size=100):
         try:
+            url = f"{self.api_url.rsplit('/', 1)[0]}/user/bulk"
             headers = {"Accept": "application/json"}
-            query = {"jql": jql_query}
-            response = requests.get(
-                self.api_url, headers=headers, params=query, auth=self.auth
-            )
 
-            if response.status_code == 200:
-                data = json.loads(response.text)
-                return data.get("issues", [])
-            else:
-                print(
-                    f"Failed to fetch Jira issues. Status code: {response.status_code}"
-                )
-                error_report(
-                    traceback.extract_stack()[-2].name,
-                    f"Failed to fetch Jira issues.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
+            emails = {}
+            for start in range(0, len(account_ids), batch_size):
+                params = {
+                    "accountId": account_ids[start : start + batch_size],
+                    "maxResults": batch_size,
+                }
+                response = send(
+                    self.budget,
+                    self.session.get,
+                    url,
+                    headers=headers,
+                    params=params,
+                    auth=self.auth,
                 )
-                return None
+                response.raise_for_status()
+                # Jira leaves out emailAddress for users who hide it.
+                for user in response.json().get("values", []):
+                    if user.get("emailAddress"):
+                        emails[user["accountId"]] = user["emailAddress"]
+            return emails
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'fetch_issues' method: {e}\n{traceback_message}",
+                f"An error occurred in 'fetch_user_emails' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'fetch_issues' method: {e}")
+            print(f"An error occurred in 'fetch_user_emails' method: {e}")
             return None
 
+    def issue_url(self, key):
+        return f"{self.api_url.rsplit('/', 1)[0]}/issue/{key}"
+
+    def transition_issue(self, key, status):
+        try:
+            url = f"{self.issue_url(key)}/transitions"
+            headers = {"Accept": "application/json"}
+
+            response = send(
+                self.budget, self.session.get, url, headers=headers, auth=self.auth
+            )
+            response.raise_for_status()
+
+            for transition in response.json().get("transitions", []):
+                target = (transition.get("to") or {}).get("name", "")
+                if status.lower() not in (target.lower(), transition["name"].lower()):
+                    continue
+                response = send(
+                    self.budget,
+                    self.session.post,
+                    url,
+                    headers=headers,
+                    json={"transition": {"id": transition["id"]}},
+                    auth=self.auth,
+                )
+                response.raise_for_status()
+                return True
+
+            # The workflow offers no way there from the current status.
+            return None
+        except Exception as e:
+            traceback_message = traceback.format_exc()
+            error_report(
+                traceback.extract_stack()[-2].name,
+                f"An error occurred in 'transition_issue' method: {e}\n{traceback_message}",
+            )
+            print(f"An error occurred in 'transition_issue' method: {e}")
+            return False
+
+    def assign_issue(self, key, account_id):
+        try:
+            response = send(
+                self.budget,
+                self.session.put,
+                f"{self.issue_url(key)}/assignee",
+                headers={"Accept": "application/json"},
+                json={"accountId": account_id},
+                auth=self.auth,
+            )
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            traceback_message = traceback.format_exc()
+            error_report(
+                traceback.extract_stack()[-2].name,
+                f"An error occurred in 'assign_issue' method: {e}\n{traceback_message}",
+            )
+            print(f"An error occurred in 'assign_issue' method: {e}")
+            return False
+
 
 class MotionClient:
-    def __init__(self, api_url, api_key):
+    def __init__(self, api_url, api_key, rate_limit=10, session=None):
         self.api_url = api_url
         self.api_key = api_key
-        self.users = []
+        self.budget = bucket_for(api_key, "motion", rate_limit)
+        self.session = session if session is not None else build_session()
+
+    def connection_stats(self):
+        return session_stats(self.session)
 
-    @sleep_and_retry
-    @limits(calls=10, period=60)
     def _rate_limited_request(self, method, url, headers=None, **kwargs):
         try:
             default_headers = {"Accept": "application/json", "X-API-Key": self.api_key}
             if headers is not None:
                 default_headers.update(headers)
 
-            response = method(url, headers=default_headers, **kwargs)
-
-            if response.status_code == 429:
-                print("Rate limit exceeded. Waiting for 60 seconds...")
-                time.sleep(60)
-
-                response = method(url, headers=default_headers, **kwargs)
-
-            return response
+            return send(self.budget, method, url, headers=default_headers, **kwargs)
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
@@ -118,64 +242,70 @@ class MotionClient:
             print(f"An error occurred in '_rate_limited_request' method: {e}")
             return None
 
-    def fetch_tasks(self, motion_user_id):
-        try:
-            url = f"{self.api_url}/v1/tasks"
+    def iter_pages(self, path, key, params):
+        url = f"{self.api_url}{path}"
+        params = dict(params)
 
-            if motion_user_id == "NA":
-                params = {"workspaceId": f"{motion_workspace}"}
-            else:
-                params = {
-                    "workspaceId": f"{motion_workspace}",
-                    "assigneeId": f"{motion_user_id}",
-                }
+        while True:
+            response = self._rate_limited_request(self.session.get, url, params=params)
+            if response is None:
+                raise RuntimeError(f"Failed to fetch Motion {key}.")
+            response.raise_for_status()
 
-            response = self._rate_limited_request(requests.get, url, params=params)
+            data = response.json()
+            for item in data.get(key, []):
+                yield item
+
+            cursor = (data.get("meta") or {}).get("nextCursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    def iter_tasks(self, params):
+        return self.iter_pages("/v1/tasks", "tasks", params)
+
+    def fetch_task(self, task_id):
+        try:
+            url = f"{self.api_url}/v1/tasks/{task_id}"
+            response = self._rate_limited_request(self.session.get, url)
 
             if response.status_code == 200:
-                return response.json().get("tasks", [])
-            elif response.status_code == 429:
-                print("Rate limit exceeded. Waiting for 60 seconds...")
-                time.sleep(60)
-                return []
+                return response.json()
+            elif response.status_code == 404:
+                print(f"Task with ID {task_id} not found in Motion. Status code: 404")
+                return None
             else:
-                print("Failed to fetch Motion tasks.")
+                print(
+                    f"Failed to fetch Motion task. Status code: {response.status_code}"
+                )
                 error_report(
                     traceback.extract_stack()[-2].name,
-                    f"Failed to fetch Motion tasks.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
+                    f"Failed to fetch Motion task.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
                 )
-                return []
+                return None
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'fetch_tasks' method: {e}\n{traceback_message}",
+                f"An error occurred in 'fetch_task' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'fetch_tasks' method: {e}")
-            return []
+            print(f"An error occurred in 'fetch_task' method: {e}")
+            return None
+
+    def fetch_snapshot(self, motion_user_ids=None):
+        params = {"workspaceId": f"{motion_workspace}"}
+        if motion_user_ids is None:
+            return MotionSnapshot(self.iter_tasks(params))
+
+        tasks = []
+        for motion_user_id in motion_user_ids:
+            tasks.extend(self.iter_tasks({**params, "assigneeId": motion_user_id}))
+        return MotionSnapshot(tasks, motion_user_ids)
 
     def fetch_users(self):
         try:
-            if not self.users:
-                url = f"{self.api_url}/v1/users"
-                headers = {"Accept": "application/json", "X-API-Key": self.api_key}
-                params = {"workspaceId": f"{motion_workspace}"}
-
-                response = self._rate_limited_request(requests.get, url, params=params)
-
-                if response.status_code == 200:
-                    self.users = response.json().get("users", [])
-                elif response.status_code == 429:
-                    print("Rate limit exceeded. Waiting for 60 seconds...")
-                    time.sleep(60)
-                else:
-                    print(
-                        f"Failed to fetch Motion users. Status code: {response.status_code}"
-                    )
-                    error_report(
-                        traceback.extract_stack()[-2].name,
-                        f"Failed to fetch Motion users.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
-                    )
+            params = {"workspaceId": f"{motion_workspace}"}
+            return list(self.iter_pages("/v1/users", "users", params))
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
@@ -183,31 +313,46 @@ class MotionClient:
                 f"An error occurred in 'fetch_users' method: {e}\n{traceback_message}",
             )
             print(f"An error occurred in 'fetch_users' method: {e}")
+            return None
 
-        return self.users
-
-    def get_user_id(self, username):
+    def create_task(self, payload):
         try:
-            users = self.fetch_users()
-            for user in users:
-                if user.get("name") == username:
-                    return user.get("id")
-            return None
+            url = f"{self.api_url}/v1/tasks"
+
+            headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "X-API-Key": self.api_key,
+            }
+
+            response = self._rate_limited_request(
+                self.session.post, url, json=payload, headers=headers
+            )
+
+            if response.status_code in (200, 201):
+                return response.json()
+            else:
+                print(
+                    f"Failed to create task in Motion. Status code: {response.status_code}"
+                )
+                error_report(
+                    traceback.extract_stack()[-2].name,
+                    f"Failed to create task in Motion.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
+                )
+                return None
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'get_user_id' method: {e}\n{traceback_message}",
+                f"An error occurred in 'create_task' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'get_user_id' method: {e}")
+            print(f"An error occurred in 'create_task' method: {e}")
             return None
 
-    def update_task_status(self, task_id, status):
+    def update_task(self, task_id, payload):
         try:
             url = f"{self.api_url}/v1/tasks/{task_id}"
 
-            payload = {"status": status}
-
             headers = {
                 "Content-Type": "application/json",
                 "Accept": "application/json",
@@ -215,37 +360,34 @@ class MotionClient:
             }
 
             response = self._rate_limited_request(
-                requests.patch, url, json=payload, headers=headers
+                self.session.patch, url, json=payload, headers=headers
             )
 
             if response.status_code == 200:
                 return response.json()
-            elif response.status_code == 429:
-                print("Rate limit exceeded. Waiting for 60 seconds...")
-                time.sleep(60)
             else:
                 print(
-                    f"Failed to update task status in Motion. Status code: {response.status_code}"
+                    f"Failed to update task in Motion. Status code: {response.status_code}"
                 )
                 error_report(
                     traceback.extract_stack()[-2].name,
-                    f"Failed to update task status in Motion.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
+                    f"Failed to update task in Motion.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
                 )
                 return None
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'update_task_status' method: {e}\n{traceback_message}",
+                f"An error occurred in 'update_task' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'update_task_status' method: {e}")
+            print(f"An error occurred in 'update_task' method: {e}")
             return None
 
-    def update_task_assignee(self, task_id, assignee_id):
+    def update_task_status(self, task_id, status):
         try:
             url = f"{self.api_url}/v1/tasks/{task_id}"
 
-            payload = {"assigneeId": f"{assignee_id}"}
+            payload = {"status": status}
 
             headers = {
                 "Content-Type": "application/json",
@@ -254,65 +396,76 @@ class MotionClient:
             }
 
             response = self._rate_limited_request(
-                requests.patch, url, json=payload, headers=headers
+                self.session.patch, url, json=payload, headers=headers
             )
 
             if response.status_code == 200:
                 return response.json()
-            elif response.status_code == 429:
-                print("Rate limit exceeded. Waiting for 60 seconds...")
-                time.sleep(60)
-            elif response.status_code == 404:
-                print(f"Task with ID {task_id} not found in Motion. Status code: 404")
-                print("Response content:", response.content)
-                return None
             else:
                 print(
-                    f"Failed to update task assignee in Motion. Status code: {response.status_code}"
+                    f"Failed to update task status in Motion. Status code: {response.status_code}"
                 )
-                print("Response content:", response.content)
                 error_report(
                     traceback.extract_stack()[-2].name,
-                    f"Failed to fetch Motion users.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
+                    f"Failed to update task status in Motion.\nResponse Content: {response.content}\nStatus code: {response.status_code}",
                 )
                 return None
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'update_task_assignee' method: {e}\n{traceback_message}",
+                f"An error occurred in 'update_task_status' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'update_task_assignee' method: {e}")
+            print(f"An error occurred in 'update_task_status' method: {e}")
             return None
 
 
+class MotionSnapshot:
+    def __init__(self, tasks, motion_user_ids=None):
+        # None means the whole workspace; otherwise only these assignees.
+        self.motion_user_ids = (
+            set(motion_user_ids) if motion_user_ids is not None else None
+        )
+        self.tasks = []
+        self.by_id = {}
+        self.by_key = {}
+        self.key_for_id = {}
+
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        self.tasks.append(task)
+        self.by_id[task["id"]] = task
+
+        key = jira_key_for_task(task)
+        if key is not None:
+            self.by_key.setdefault(key, task)
+            self.key_for_id[task["id"]] = key
+
+    def covers(self, motion_user_id):
+        return self.motion_user_ids is None or motion_user_id in self.motion_user_ids
+
+    def adopt(self, task_ids):
+        for key, task_id in task_ids.items():
+            if task_id in self.by_id:
+                self.by_key.setdefault(key, self.by_id[task_id])
+                self.key_for_id.setdefault(task_id, key)
+
+
 class IssueFetcher:
-    def __init__(self, jira_client, motion_client):
+    def __init__(self, jira_client, motion_client, directory):
         self.jira_client = jira_client
         self.motion_client = motion_client
-        self.jira_issues = []
-        self.motion_tasks = []
+        self.directory = directory
+        self.reconciler = Reconciler(motion_client, directory)
+        self.untransitioned = set()
 
-    def compare_issues_to_tasks(self, jql_query, assignee_name):
+    def compare_issues_to_tasks(self, jira_issues, snapshot):
         try:
-            motion_user_id = self.motion_client.get_user_id(assignee_name)
-            jira_issues = self.jira_client.fetch_issues(jql_query)
-            motion_tasks = self.motion_client.fetch_tasks(motion_user_id)
-
-            jira_task_names = set(
-                f"{issue['fields']['summary']} ({issue['key']})"
-                for issue in jira_issues
-            )
-            motion_task_names = set(task["name"] for task in motion_tasks)
-
-            jira_not_in_motion = jira_task_names - motion_task_names
-
             return {
                 "jira_not_in_motion": [
-                    issue
-                    for issue in jira_issues
-                    if f"{issue['fields']['summary']} ({issue['key']})"
-                    in jira_not_in_motion
+                    issue for issue in jira_issues if issue.key not in snapshot.by_key
                 ],
             }
         except Exception as e:
@@ -324,26 +477,11 @@ class IssueFetcher:
             print(f"An error occurred in 'compare_issues_to_tasks' method: {e}")
             return {"jira_not_in_motion": []}
 
-    def create_task_in_motion(self, issue):
+    def build_task_payload(self, issue):
         try:
-            assignee = issue["fields"].get("assignee")
-            assignee_name = (
-                assignee.get("displayName", "Not Assigned")
-                if assignee is not None
-                else "Not Assigned"
-            )
-
-            priority = issue["fields"].get("priority")
-            priority_name = (
-                priority.get("name", "Medium") if priority is not None else "Medium"
-            )
-
-            if priority_name == "Highest":
-                priority_name = "ASAP"
-            elif priority_name == "Lowest":
-                priority_name = "Low"
-
-            motion_user_id = self.motion_client.get_user_id(assignee_name)
+            _, assignee_name = jira_assignee(issue)
+            priority_name = motion_priority(issue)
+            motion_user_id = self.reconciler.motion_user_for_issue(issue)
 
             if motion_user_id is None:
                 print(f"Failed to find Motion user ID for {assignee_name}")
@@ -353,15 +491,15 @@ class IssueFetcher:
             one_day = timedelta(days=1)
             current_time_plus_1_day = current_time + one_day
             current_time_iso8601 = current_time_plus_1_day.isoformat()
-            duedate_str = issue["fields"]["duedate"]
+            duedate_str = issue.duedate
             if duedate_str is None:
                 duedate_datetime = datetime.now() + timedelta(days=1)
             else:
                 duedate_datetime = datetime.strptime(duedate_str, "%Y-%m-%d")
             duedate_iso8601 = duedate_datetime.isoformat()
 
-            link = f"{jira_url}/browse/{issue['key']}"
-            motion_task_name = f"{issue['fields']['summary']} ({issue['key']})"
+            link = f"{jira_url}/browse/{issue.key}"
+            motion_task_name = f"{issue.summary} ({issue.key})"
 
             payload = {
                 "dueDate": duedate_iso8601,
@@ -380,25 +518,14 @@ class IssueFetcher:
                 "assigneeId": motion_user_id,
             }
 
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-                "X-API-Key": self.motion_client.api_key,
-            }
-
-            url = f"{self.motion_client.api_url}/v1/tasks"
-            response = requests.post(url, json.dumps(payload), headers=headers)
-
-            time.sleep(5)
-
-            return response.text
+            return payload
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'create_task_in_motion' method: {e}\n{traceback_message}",
+                f"An error occurred in 'build_task_payload' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'create_task_in_motion' method: {e}")
+            print(f"An error occurred in 'build_task_payload' method: {e}")
             return None
 
     def update_motion_task_status(self, task_id, status):
@@ -413,123 +540,620 @@ class IssueFetcher:
             print(f"An error occurred in 'update_motion_task_status' method: {e}")
             return None
 
-    def task_exists_in_jira(self, task, jira_issues):
-        try:
-            task_name = task["name"]
-            return any(
-                task_name == f"{issue['fields']['summary']} ({issue['key']})"
-                for issue in jira_issues
+    def apply_jira_change(self, change):
+        if change.field == "status":
+            done_status = (config.get("sync") or {}).get("jira_done_status", "Done")
+            result = self.jira_client.transition_issue(change.key, done_status)
+            if result is None:
+                # Keep the change pending so it is retried once the workflow
+                # allows it; report it once per issue.
+                if change.key not in self.untransitioned:
+                    self.untransitioned.add(change.key)
+                    message = (
+                        f"No transition to '{done_status}' is available for "
+                        f"{change.key}; its Motion completion stays pending"
+                    )
+                    print(message)
+                    error_report(traceback.extract_stack()[-2].name, message)
+                return False
+            self.untransitioned.discard(change.key)
+            if result:
+                print(f"Transitioned {change.key} to {done_status} from Motion")
+            return result
+
+        account_id = self.directory.jira_account_id(change.new)
+        if account_id is None:
+            user = self.directory.user(change.new) or {}
+            print(
+                f"Motion user {user.get('name', change.new)} has no Jira account on "
+                f"the roster; leaving {change.key}'s assignee alone"
             )
+            return True
+        result = self.jira_client.assign_issue(change.key, account_id)
+        if result:
+            print(f"Reassigned {change.key} from Motion")
+        return result
+
+    def plan_changes(self, tasks_by_key, issues_by_key):
+        try:
+            changes = self.reconciler.plan(tasks_by_key, issues_by_key)
+
+            for assignee_name in self.reconciler.unmapped:
+                print(f"Failed to find Motion user ID for '{assignee_name}'")
+                error_report(
+                    traceback.extract_stack()[-2].name,
+                    f"Failed to find Motion user ID for '{assignee_name}'",
+                )
+
+            return changes
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'task_exists_in_jira' method: {e}\n{traceback_message}",
+                f"An error occurred in 'plan_changes' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'task_exists_in_jira' method: {e}")
-            return False
+            print(f"An error occurred in 'plan_changes' method: {e}")
+            return []
 
-    def sync_assignees(self, motion_tasks, jira_issues):
+    def apply_changes(self, changes):
         try:
-            for motion_task in motion_tasks:
-                motion_assignee_list = motion_task.get("assignees", [])
-                if motion_assignee_list:
-                    motion_assignee = motion_assignee_list[0].get("name")
-                else:
-                    motion_assignee = None
-                motion_task_name = motion_task["name"]
-
-                for jira_issue in jira_issues:
-                    jira_assignee = jira_issue["fields"]["assignee"]
-                    jira_task_name = (
-                        f"{jira_issue['fields']['summary']} ({jira_issue['key']})"
-                    )
-
-                    if (
-                        motion_task_name == jira_task_name
-                        and motion_assignee != jira_assignee
-                    ):
-                        jira_assignee_name = (
-                            jira_assignee.get("displayName", "Not Assigned")
-                            if jira_assignee is not None
-                            else "Not Assigned"
-                        )
-                        jira_user_id = self.motion_client.get_user_id(
-                            jira_assignee_name
-                        )
-
-                        if jira_user_id is not None:
-                            self.motion_client.update_task_assignee(
-                                motion_task["id"], jira_user_id
-                            )
-                        else:
-                            print(
-                                f"Failed to find Jira user ID for '{jira_assignee_name}'"
-                            )
-                            error_report(
-                                traceback.extract_stack()[-2].name,
-                                f"Failed to find Jira user ID for '{jira_assignee_name}'",
-                            )
+            return self.reconciler.apply(changes)
         except Exception as e:
             traceback_message = traceback.format_exc()
             error_report(
                 traceback.extract_stack()[-2].name,
-                f"An error occurred in 'sync_assignees' method: {e}\n{traceback_message}",
+                f"An error occurred in 'apply_changes' method: {e}\n{traceback_message}",
             )
-            print(f"An error occurred in 'sync_assignees' method: {e}")
+            print(f"An error occurred in 'apply_changes' method: {e}")
+            return []
 
 
-def main():
-    try:
-        check_running()
+def jql_list(values):
+    return ", ".join(f'"{value}"' for value in values)
+
+
+def plan_cycle(jira_client, motion_client, issue_fetcher, concurrent=False):
+    global latest_snapshot
+
+    if partitioner is not None:
+        return plan_slice(jira_client, motion_client, issue_fetcher)
 
-        jira_client = JiraClient(jira_api_url, jira_auth)
-        motion_client = MotionClient(motion_api_url, motion_api_key)
+    sync_config = config.get("sync") or {}
+    started = datetime.utcnow()
+    full = sync_state.full_reconcile_due(sync_config.get("full_reconcile_hours", 6))
 
-        issue_fetcher = IssueFetcher(jira_client, motion_client)
+    roster = jql_list(assignees)
+    closed = jql_list(CLOSED_STATUSES)
+    jql_query = f"status not in ({closed}) AND type != Epic AND assignee in ({roster}) "
+    closed_query = None
+    if not full:
+        # Relative JQL dates sidestep the Jira user's timezone; the extra minutes
+        # cover clock skew and issues updated while the last cycle was running.
+        elapsed = started - sync_state.last_run()
+        minutes = int(elapsed.total_seconds() // 60) + 5
+        jql_query += f'AND updated >= "-{minutes}m" '
+        # No roster filter here: issues are often reassigned as they close, and
+        # the join against the snapshot drops anything we never synced.
+        closed_query = f'status changed to ({closed}) after "-{minutes}m"'
+    jql_query += "order by updated asc"
 
-        all_issues = []
-        jira_issues = []
+    if concurrent:
+        snapshot, jira_issues, closed_issues = asyncio.run(
+            fetch_cycle_inputs(jira_client, motion_client, jql_query, closed_query)
+        )
+    else:
+        snapshot = motion_client.fetch_snapshot()
+        jira_issues = list(jira_client.iter_issues(jql_query))
+        closed_issues = []
+        if closed_query is not None:
+            closed_issues = list(jira_client.iter_issues(closed_query))
+    snapshot.adopt(sync_state.task_ids())
+    latest_snapshot = snapshot
+    issues_by_key = index_issues_by_key(jira_issues)
+
+    if full:
+        changed_by_key = issues_by_key
+        # A full pass sees every open issue, so any synced task without one
+        # has drifted: closed, deleted or moved off the roster.
+        closed_keys = set(snapshot.key_for_id.values()) - set(issues_by_key)
+    else:
+        fingerprints = sync_state.fingerprints()
+        changed_by_key = {
+            key: issue
+            for key, issue in issues_by_key.items()
+            if fingerprints.get(key) != fingerprint(issue)
+        }
+        closed_keys = set(issue.key for issue in closed_issues)
+        closed_keys.difference_update(issues_by_key)
+
+    issues_result = issue_fetcher.compare_issues_to_tasks(jira_issues, snapshot)
+
+    return {
+        "started": started,
+        "full": full,
+        "issues": jira_issues,
+        "snapshot": snapshot,
+        "create": issues_result["jira_not_in_motion"],
+        "complete": [
+            task
+            for task in snapshot.tasks
+            if snapshot.key_for_id.get(task["id"]) in closed_keys
+            and is_jira_task(task)
+            and not is_resolved(task)
+        ],
+        "update": issue_fetcher.plan_changes(snapshot.by_key, changed_by_key),
+    }
+
+
+def plan_slice(jira_client, motion_client, issue_fetcher):
+    global latest_snapshot
+
+    started = datetime.utcnow()
+    closed = jql_list(CLOSED_STATUSES)
+
+    # A cheap roster-wide look at what moved since the last cycle decides
+    # which assignees get promoted into the next slice.
+    last_run = sync_state.last_run()
+    if last_run is not None:
+        minutes = int((started - last_run).total_seconds() // 60) + 5
+        probe_query = (
+            f"type != Epic AND assignee in ({jql_list(assignees)}) "
+            f'AND updated >= "-{minutes}m"'
+        )
+        fingerprints = sync_state.fingerprints()
+        partitioner.promote(
+            jira_assignee(issue)[0]
+            for issue in jira_client.iter_issues(probe_query)
+            if fingerprints.get(issue.key) != fingerprint(issue)
+        )
+
+    account_ids = partitioner.next_slice(write_allowance(motion_client.budget))
+    motion_user_ids = []
+    for account_id in account_ids:
+        motion_user_id = issue_fetcher.directory.motion_user_id(account_id)
+        if motion_user_id is not None:
+            motion_user_ids.append(motion_user_id)
+
+    jql_query = (
+        f"status not in ({closed}) AND type != Epic "
+        f"AND assignee in ({jql_list(account_ids)}) order by updated asc"
+    )
+    snapshot = motion_client.fetch_snapshot(motion_user_ids)
+    snapshot.adopt(sync_state.task_ids())
+    latest_snapshot = snapshot
+    jira_issues = list(jira_client.iter_issues(jql_query))
+    issues_by_key = index_issues_by_key(jira_issues)
+
+    # An issue reassigned within the roster keeps its task under the previous
+    # Motion assignee, which may sit in another slice.
+    for key in issues_by_key:
+        state = sync_state.get(key)
+        if key not in snapshot.by_key and state is not None:
+            task = motion_client.fetch_task(state["motion_task_id"])
+            if task is not None:
+                snapshot.add(task)
+                snapshot.adopt({key: task["id"]})
+
+    # Likewise a task here without an open issue in this slice has either
+    # closed or moved to someone else on the roster; only the former completes.
+    missing = sorted(set(snapshot.key_for_id.values()) - set(issues_by_key))
+    for start in range(0, len(missing), 100):
+        moved_query = (
+            f"key in ({jql_list(missing[start:start + 100])}) "
+            f"AND status not in ({closed}) AND type != Epic "
+            f"AND assignee in ({jql_list(assignees)})"
+        )
+        for issue in jira_client.iter_issues(moved_query, validateQuery="warn"):
+            jira_issues.append(issue)
+            issues_by_key[issue.key] = issue
+    closed_keys = set(missing) - set(issues_by_key)
+
+    issues_result = issue_fetcher.compare_issues_to_tasks(jira_issues, snapshot)
+
+    return {
+        "started": started,
+        "full": False,
+        "slice": account_ids,
+        "issues": jira_issues,
+        "snapshot": snapshot,
+        "create": issues_result["jira_not_in_motion"],
+        "complete": [
+            task
+            for task in snapshot.tasks
+            if snapshot.key_for_id.get(task["id"]) in closed_keys
+            and is_jira_task(task)
+            and not is_resolved(task)
+        ],
+        "update": issue_fetcher.plan_changes(snapshot.by_key, issues_by_key),
+    }
 
-        for assignee_id, assignee_name in assignees.items():
-            jql_query = (
-                'status not in (Done, "On Hold", Complete, Closed, Resolved, Backlog, Withdrawn, Denied) '
-                "AND type != Epic "
-                f"AND assignee = {assignee_id} "
-                "order by updated asc"
+
+def capture_motion_changes(plan):
+    plan["jira"] = capture.diff(plan["snapshot"], plan["full"])
+
+    # Motion wins for tasks changed there; pushing Jira's older state back now
+    # would undo the change before Jira has caught up.
+    captured = set(change.key for change in plan["jira"])
+    plan["update"] = [change for change in plan["update"] if change.key not in captured]
+
+
+def remember_writes(tasks):
+    if capture is not None:
+        capture.remember(list(tasks))
+
+
+def record_cycle(plan, created, applied, completed):
+    failed_keys = set(change.key for change in plan["update"])
+    failed_keys.difference_update(change.key for change in applied)
+
+    rows = []
+    for issue in plan["issues"]:
+        task = created.get(issue.key) or plan["snapshot"].by_key.get(issue.key)
+        if task is None or issue.key in failed_keys:
+            continue
+        rows.append((issue.key, task["id"], fingerprint(issue)))
+    sync_state.record_many(rows)
+
+    sync_state.forget_many(
+        key
+        for key in (jira_key_for_task(task) for task in completed)
+        if key is not None
+    )
+
+    sync_state.mark_run(plan["started"], plan["full"])
+    if plan.get("slice") is not None:
+        sync_state.mark_visited(plan["slice"], plan["started"])
+
+
+def journal_creates(issue_fetcher, issues, snapshot):
+    for issue in issues:
+        payload = issue_fetcher.build_task_payload(issue)
+        if payload is not None:
+            sync_state.journal_create(issue.key, payload, fingerprint(issue))
+
+    entries = []
+    for entry in sync_state.pending_creates():
+        # Only a snapshot that could hold the task can tell whether an earlier
+        # POST already created it; other slices' entries wait for their turn.
+        if snapshot is not None and not snapshot.covers(
+            entry["payload"].get("assigneeId")
+        ):
+            continue
+        # A task that already exists was created by a run that died before it
+        # could record the id, so adopt it instead of creating it twice.
+        task = snapshot.by_key.get(entry["jira_key"]) if snapshot else None
+        if task is not None:
+            sync_state.finish_create(
+                entry["jira_key"], task["id"], entry["fingerprint"]
+            )
+        else:
+            entries.append(entry)
+    return entries
+
+
+def finish_create(entry, task, snapshot, max_attempts=5):
+    if task is None:
+        key = entry["jira_key"]
+        attempts = sync_state.fail_create(key)
+        if attempts >= max_attempts:
+            # Planning the issue again journals a fresh entry, so a full
+            # reconcile or the next change to the issue retries it.
+            sync_state.drop_create(key)
+            message = (
+                f"Gave up creating a Motion task for {key} after {attempts} "
+                "failed attempts; it is retried when the issue is next planned"
             )
+            print(message)
+            error_report(traceback.extract_stack()[-2].name, message)
+        return None
+
+    sync_state.finish_create(entry["jira_key"], task["id"], entry["fingerprint"])
+    if snapshot is not None:
+        snapshot.add(task)
+    print(f"Created Motion task {task.get('id')} for {entry['jira_key']}")
+    return task
+
+
+def dispatch_create(issue_fetcher, issue, snapshot):
+    # Send only the create this event is about; the rest of the journal stays
+    # with the write queue and its budget.
+    payload = issue_fetcher.build_task_payload(issue)
+    if payload is None:
+        return None
+    # An earlier attempt may have reached Motion; if this snapshot could not
+    # show that task, leave the entry to the cycle that syncs its assignee.
+    if sync_state.journaled(issue.key) and not (
+        snapshot is not None and snapshot.covers(payload.get("assigneeId"))
+    ):
+        return None
+
+    entry = {
+        "jira_key": issue.key,
+        "payload": payload,
+        "fingerprint": fingerprint(issue),
+    }
+    sync_state.journal_create(issue.key, payload, entry["fingerprint"])
+    write_queue.discard("create", issue.key)
+    task = issue_fetcher.motion_client.create_task(payload)
+    return finish_create(entry, task, snapshot)
+
+
+def queue_writes(issue_fetcher, plan):
+    motion_client = issue_fetcher.motion_client
+
+    # Creates default their Motion due date to tomorrow, so rank them by the
+    # Jira due date instead; replayed journal entries may no longer have one.
+    issues_by_key = index_issues_by_key(plan["create"])
+    entries = journal_creates(issue_fetcher, plan["create"], plan["snapshot"])
+    # A create still queued from an earlier cycle may have been finished since
+    # (by a webhook, or adopted from the snapshot); sending it again would
+    # duplicate the task.
+    write_queue.retain("create", set(entry["jira_key"] for entry in entries))
+    for entry in entries:
+        payload = entry["payload"]
+        issue = issues_by_key.get(entry["jira_key"])
+        queued_at = datetime.fromisoformat(entry["queued_at"])
+        write_queue.push(
+            "create",
+            entry["jira_key"],
+            payload.get("priority"),
+            issue.duedate if issue is not None else None,
+            partial(motion_client.create_task, payload),
+            entry,
+            queued_at.replace(tzinfo=timezone.utc).timestamp(),
+        )
+
+    for task in plan["complete"]:
+        write_queue.push(
+            "complete",
+            task["id"],
+            task.get("priority"),
+            task.get("dueDate"),
+            partial(issue_fetcher.update_motion_task_status, task["id"], "Completed"),
+            task,
+        )
+
+    for change in plan["update"]:
+        write_queue.push(
+            "update",
+            change.key,
+            motion_priority(change.issue),
+            change.issue.duedate,
+            partial(issue_fetcher.apply_changes, [change]),
+            change,
+        )
+
 
-            issues_result = issue_fetcher.compare_issues_to_tasks(
-                jql_query, assignee_name
+def write_allowance(budget):
+    # What the bucket holds now plus what it refills during one write window;
+    # anything beyond that waits in the queue for the next cycle.
+    write_window = (config.get("sync") or {}).get("write_window", 60)
+    return int(budget.remaining() + budget.fill_rate * write_window)
+
+
+def print_plan(plan):
+    if plan.get("slice") is not None:
+        names = ", ".join(assignees[account_id] for account_id in plan["slice"])
+        print(f"Roster slice cycle: {names}")
+    else:
+        print(f"{'Full' if plan['full'] else 'Incremental'} cycle:")
+    print(f"Create {len(plan['create'])} Motion task(s):")
+    for issue in plan["create"]:
+        print(f"  {issue.key}: {issue.summary}")
+
+    print(f"Complete {len(plan['complete'])} Motion task(s):")
+    for task in plan["complete"]:
+        print(f"  {task['id']}: {task['name']}")
+
+    print(f"Update {len(plan['update'])} Motion task(s):")
+    for change in plan["update"]:
+        print(f"  {change}")
+
+    if plan.get("jira") is not None:
+        print(f"Update {len(plan['jira'])} Jira issue(s) from Motion:")
+        for change in plan["jira"]:
+            print(f"  {change}")
+
+    if partitioner is not None:
+        partitioner.report(limit=len(assignees))
+
+
+def build_issue_fetcher():
+    http_config = config.get("http")
+    jira_client = JiraClient(
+        jira_api_url,
+        jira_auth,
+        config["jira"].get("rate_limit", 100),
+        session_from_config(http_config),
+    )
+    motion_client = MotionClient(
+        motion_api_url,
+        motion_api_key,
+        config["motion"].get("rate_limit", 10),
+        session_from_config(http_config),
+    )
+    directory = UserDirectory(
+        motion_client,
+        jira_client,
+        assignees,
+        (config.get("sync") or {}).get("state_file", "sync_state.db"),
+        config["motion"].get("users_ttl", 3600),
+    ).start()
+    return IssueFetcher(jira_client, motion_client, directory)
+
+
+def print_connection_stats(issue_fetcher):
+    for client in (issue_fetcher.jira_client, issue_fetcher.motion_client):
+        for host, stats in client.connection_stats().items():
+            print(
+                f"{host}: {stats['requests']} requests over "
+                f"{stats['connections']} connections ({stats['reused']} reused)"
             )
-            issues = jira_client.fetch_issues(jql_query)
-            jira_issues.extend(issues)
-            all_issues.extend(issues_result["jira_not_in_motion"])
 
-        if all_issues:
-            for issue in all_issues:
-                response = issue_fetcher.create_task_in_motion(issue)
-                print(response)
 
-        time.sleep(60)
+def is_synced_issue(issue):
+    return (
+        issue.account_id in assignees
+        and issue.issue_type != "Epic"
+        and issue.status not in CLOSED_STATUSES
+    )
+
+
+def handle_webhook_event(issue_fetcher, event, issue):
+    try:
+        issue = IssueRecord.from_json(issue)
+        key = issue.key
+        state = sync_state.get(key)
+        snapshot = latest_snapshot
+
+        task = None
+        if snapshot is not None:
+            task = snapshot.by_key.get(key)
+            if task is None and state is not None:
+                task = snapshot.by_id.get(state["motion_task_id"])
+        if task is None and state is not None:
+            task = issue_fetcher.motion_client.fetch_task(state["motion_task_id"])
+
+        if event == "jira:issue_deleted" or not is_synced_issue(issue):
+            if task is None or is_resolved(task):
+                return 0
+            print(f"Completing Motion task {task['id']} for {key} ({event})")
+            result = issue_fetcher.update_motion_task_status(task["id"], "Completed")
+            if result:
+                task.update(result)
+                sync_state.forget(key)
+                remember_writes([task])
+                count_items("completed")
+                return 1
+            return 0
+
+        if task is None:
+            task = dispatch_create(issue_fetcher, issue, snapshot)
+            if task is None:
+                return 0
+            remember_writes([task])
+            count_items("created")
+            return 1
+
+        if state is not None and state["fingerprint"] == fingerprint(issue):
+            return 0
+        if capture is not None and capture.unapplied(task, key):
+            print(f"Leaving {key} alone until its Motion changes reach Jira")
+            return 0
+
+        changes = issue_fetcher.plan_changes({key: task}, {key: issue})
+        applied = issue_fetcher.apply_changes(changes)
+        if len(applied) == len(changes):
+            sync_state.record(key, task["id"], fingerprint(issue))
+        remember_writes(change.task for change in applied)
+        count_items("updated", len(applied))
+        return len(applied)
+    except Exception as e:
+        traceback_message = traceback.format_exc()
+        error_report(
+            traceback.extract_stack()[-2].name,
+            f"An error occurred in 'handle_webhook_event' function: {e}\n{traceback_message}",
+        )
+        print(f"An error occurred in 'handle_webhook_event' function: {e}")
+        return 0
+
 
-        motion_tasks = motion_client.fetch_tasks("NA")
-        motion_tasks = [task for task in motion_tasks]
+def wait_for_next_cycle(delay, receiver, issue_fetcher):
+    deadline = time.monotonic() + delay
 
-        for task in motion_tasks:
-            motion_task_name = task["name"]
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if receiver is None:
+            time.sleep(remaining)
+            return
 
-            if not issue_fetcher.task_exists_in_jira(task, jira_issues):
-                motion_task_id = task["id"]
-                issue_fetcher.update_motion_task_status(motion_task_id, "Completed")
+        webhook_event = receiver.next_event(timeout=remaining)
+        if webhook_event is not None:
+            handle_webhook_event(issue_fetcher, *webhook_event)
 
-        time.sleep(60)
 
-        issue_fetcher.sync_assignees(motion_tasks, jira_issues)
+def main(issue_fetcher, plan_only=False):
+    try:
+        started = time.perf_counter()
+        concurrent = (config.get("sync") or {}).get("mode", "sync") == "async"
+
+        jira_client = issue_fetcher.jira_client
+        motion_client = issue_fetcher.motion_client
+
+        requests_before = motion_client.budget.requests
+        with phase("plan"):
+            plan = plan_cycle(jira_client, motion_client, issue_fetcher, concurrent)
+            if capture is not None:
+                capture_motion_changes(plan)
+
+        if plan_only:
+            print_plan(plan)
+            return
+
+        queue_writes(issue_fetcher, plan)
+        batch = write_queue.take(write_allowance(motion_client.budget))
+        with phase("write"):
+            results = run_writes(
+                [timed_write(item.kind, item.call) for item in batch],
+                motion_client.budget,
+                concurrent,
+            )
 
-        time.sleep(60)
+        created = {}
+        completed = []
+        applied = []
+        for item, result in zip(batch, results):
+            if item.kind == "create":
+                if finish_create(item.context, result, plan["snapshot"]) is not None:
+                    created[item.key] = result
+            elif item.kind == "complete":
+                if result:
+                    item.context.update(result)
+                    completed.append(item.context)
+            else:
+                applied.extend(result)
+
+        jira_applied = []
+        if capture is not None:
+            with phase("jira"):
+                jira_results = run_writes(
+                    [
+                        timed_write(
+                            "jira", partial(issue_fetcher.apply_jira_change, change)
+                        )
+                        for change in plan["jira"]
+                    ],
+                    jira_client.budget,
+                    concurrent,
+                )
+            jira_applied = [
+                change for change, result in zip(plan["jira"], jira_results) if result
+            ]
+
+        with phase("record"):
+            record_cycle(plan, created, applied, completed)
+            if capture is not None:
+                capture.commit(jira_applied)
+            remember_writes(
+                list(created.values()) + [change.task for change in applied] + completed
+            )
+        count_items("created", len(created))
+        count_items("completed", len(completed))
+        count_items("updated", len(applied))
+        count_items("jira_updated", len(jira_applied))
+        write_queue.report()
+        if partitioner is not None:
+            partitioner.observe(
+                plan["slice"], motion_client.budget.requests - requests_before
+            )
+            partitioner.report()
+        print_connection_stats(issue_fetcher)
 
-        os.remove("/tmp/jiraMotionSync.lock")
+        cycle_succeeded()
+        observe_phase("cycle", time.perf_counter() - started)
+        return len(created) + len(completed) + len(applied) + len(jira_applied)
     except Exception as e:
         traceback_message = traceback.format_exc()
         error_report(
@@ -537,27 +1161,156 @@ def main():
             f"An error occurred in 'main' function: {e}\n{traceback_message}",
         )
         print(f"An error occurred in 'main' function: {e}")
-        print("Restarting in 15 seconds...")
-        time.sleep(15)
+        return None
+
+
+def configure(loaded_config, roster=None):
+    global config, jira_url, jira_api_url, jira_auth, motion_api_url
+    global motion_api_key, motion_workspace, reporter, write_queue, sync_state
+    global assignees, lock_file, partitioner, capture
+
+    config = loaded_config
+    if roster is not None:
+        assignees = roster
+
+    jira_url = config["jira"]["url"]
+    jira_api_url = config["jira"]["api"]
+    jira_auth = (config["jira"]["user"], config["jira"]["api_key"])
+    motion_api_url = config["motion"]["url"]
+    motion_api_key = config["motion"]["api_key"]
+    motion_workspace = config["motion"]["workspace_id"]
+    if config.get("jira-log-api"):
+        reporter = ErrorReporter(
+            config["jira-log-api"], session_from_config(config.get("http"))
+        ).start()
+        atexit.register(reporter.close)
+    write_queue = WriteQueue()
+    sync_config = config.get("sync") or {}
+    sync_state = SyncState(sync_config.get("state_file", "sync_state.db"))
+    lock_file = sync_config.get("lock_file", lock_file)
+    if sync_config.get("motion_to_jira"):
+        capture = ChangeCapture(sync_state)
+    partition_config = sync_config.get("partition") or {}
+    if partition_config.get("enabled"):
+        partitioner = RosterPartitioner(
+            sync_state,
+            assignees,
+            partition_config.get("requests_per_assignee", 3),
+            partition_config.get("max_slice"),
+        )
 
-    print("Sleeping for 15 minutes before the next execution...")
-    time.sleep(15 * 60)
+
+def run(plan_only=False, profile_dir=None):
+    if not plan_only:
+        acquire_lock(config.get("sync") or {})
+
+    schedule_config = config.get("schedule") or {}
+    scheduler = CycleScheduler(
+        schedule_config.get("min_interval", 60),
+        schedule_config.get("max_interval", 900),
+    )
+
+    receiver = None
+    webhook_config = config.get("webhook") or {}
+    if webhook_config.get("enabled") and not plan_only:
+        if not webhook_config.get("secret"):
+            # Without a secret anyone who can reach the port could complete or
+            # create tasks, so keep polling instead.
+            message = "webhook.enabled is set without webhook.secret; not listening for webhooks"
+            print(message)
+            error_report(traceback.extract_stack()[-2].name, message)
+        else:
+            receiver = WebhookReceiver(
+                webhook_config.get("host", "0.0.0.0"),
+                webhook_config.get("port", 8080),
+                webhook_config.get("path", "/jira-webhook"),
+                webhook_config["secret"],
+            ).start()
+            # Webhooks carry the changes; polling only has to catch what they miss.
+            poll_interval = webhook_config.get("poll_interval", 3600)
+            scheduler = CycleScheduler(poll_interval, poll_interval)
+
+    metrics_config = config.get("metrics") or {}
+    if metrics_config.get("enabled") and not plan_only:
+        try:
+            serve(
+                metrics_config.get("host", "127.0.0.1"),
+                metrics_config.get("port", 9108),
+            )
+        except OSError as e:
+            traceback_message = traceback.format_exc()
+            error_report(
+                traceback.extract_stack()[-2].name,
+                f"Failed to serve metrics, continuing without them: {e}\n{traceback_message}",
+            )
+            print(f"Failed to serve metrics, continuing without them: {e}")
+
+    profiler = CycleProfiler(profile_dir) if profile_dir else None
+    issue_fetcher = build_issue_fetcher()
+
+    if plan_only:
+        if profiler is not None:
+            profiler.start()
+        main(issue_fetcher, plan_only=True)
+        if profiler is not None:
+            profiler.stop()
+        return
+
+    while True:
+        if profiler is not None:
+            profiler.start()
+        changes = main(issue_fetcher)
+        if profiler is not None:
+            profiler.stop()
+        if partitioner is not None:
+            delay = partitioner.next_delay(
+                issue_fetcher.motion_client.budget, scheduler.min_interval
+            )
+            rotation = partitioner.rotation_seconds()
+            rotation = f"{rotation / 60:.0f}m" if rotation >= 60 else f"{rotation:.0f}s"
+            print(f"A full roster rotation takes about {rotation} at this pace")
+        else:
+            delay = scheduler.next_delay(changes, list(buckets.values()))
+        print(f"Sleeping for {delay:.0f} seconds before the next execution...")
+        wait_for_next_cycle(delay, receiver, issue_fetcher)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jira/Motion Sync")
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="print the Motion changes for one cycle without writing them",
+    )
+    parser.add_argument(
+        "--target",
+        help="with sync targets configured, run only the named target in-process",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profiles",
+        metavar="DIR",
+        help="write cProfile and tracemalloc snapshots for each cycle to DIR",
+    )
+    args = parser.parse_args()
+
     try:
         with open("config.yaml", "r") as config_file:
-            config = yaml.safe_load(config_file)
-
-        jira_url = config["jira"]["url"]
-        jira_api_url = config["jira"]["api"]
-        jira_auth = (config["jira"]["user"], config["jira"]["api_key"])
-        motion_api_url = config["motion"]["url"]
-        motion_api_key = config["motion"]["api_key"]
-        motion_workspace = config["motion"]["workspace_id"]
-
-        while True:
-            main()
+            loaded_config = yaml.safe_load(config_file)
+
+        if loaded_config.get("targets"):
+            if args.plan or args.target or args.profile:
+                name = args.target or loaded_config["targets"][0]["name"]
+                target = find_target(loaded_config, name)
+                configure(target_config(loaded_config, target), target.get("assignees"))
+                run(args.plan, args.profile)
+            else:
+                acquire_lock(loaded_config.get("sync") or {})
+                supervise(loaded_config)
+        else:
+            configure(loaded_config)
+            run(args.plan, args.profile)
     except Exception as e:
         traceback_message = traceback.format_exc()
         error_report(
@@ -0,0 +1,231 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import argparse, contextlib, io, json, multiprocessing, resource, sys, tempfile, time
+import types
+from fakes import FakeJira, FakeMotion, make_issue
+
+SIZES = (100, 1000, 10000)
+PRIORITIES = ("Highest", "High", "Medium", "Low", "Lowest")
+
+app = None
+issue_fetcher = None
+
+
+def build_fixtures(count, per_assignee):
+    roster_size = max(1, count // per_assignee)
+    roster = {f"bench-account-{n}": f"Bench User {n}" for n in range(roster_size)}
+    users = [
+        {
+            "id": f"bench-user-{n}",
+            "name": f"Bench User {n}",
+            "email": f"bench.user.{n}@example.com",
+        }
+        for n in range(roster_size)
+    ]
+    jira_users = [
+        {
+            "accountId": f"bench-account-{n}",
+            "displayName": f"Bench User {n}",
+            "emailAddress": f"bench.user.{n}@example.com",
+        }
+        for n in range(roster_size)
+    ]
+
+    issues = []
+    for n in range(count):
+        account_id = f"bench-account-{n % roster_size}"
+        issues.append(
+            make_issue(
+                f"BENCH-{n + 1}",
+                f"Benchmark issue {n + 1}",
+                account_id,
+                roster[account_id],
+                priority=PRIORITIES[n % len(PRIORITIES)],
+                duedate="2030-01-15" if n % 3 == 0 else None,
+            )
+        )
+    return roster, users, jira_users, issues
+
+
+def churn(jira, fraction):
+    # Touch a slice of the issues between cycles: mostly due date moves, with
+    # every fourth one closed so the warm cycle also completes tasks.
+    keys = list(jira.issues)
+    step = max(1, int(1 / fraction)) if fraction > 0 else len(keys) + 1
+    for n, key in enumerate(keys[::step]):
+        if n % 4 == 3:
+            jira.update_issue(key, status="Done")
+        else:
+            jira.update_issue(key, duedate="2031-06-30")
+
+
+def setup_cycle(sync_config, roster):
+    global app, issue_fetcher
+
+    # app.py imports its roster from variables.py; the benchmark brings its own.
+    variables = types.ModuleType("variables")
+    variables.assignees = roster
+    sys.modules["variables"] = variables
+
+    import app
+
+    app.configure(sync_config, roster)
+    issue_fetcher = app.build_issue_fetcher()
+
+
+def run_cycle():
+    budgets = list(app.buckets.values())
+    waited = sum(bucket.waited for bucket in budgets)
+    throttled = sum(bucket.throttled for bucket in budgets)
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        changes = app.main(issue_fetcher)
+    wall = time.perf_counter() - started
+
+    budgets = list(app.buckets.values())
+    return {
+        "wall": wall,
+        "changes": changes,
+        "rate_wait": sum(bucket.waited for bucket in budgets) - waited,
+        "throttled": sum(bucket.throttled for bucket in budgets) - throttled,
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def bench_size(count, args, context):
+    roster, users, jira_users, issues = build_fixtures(count, args.per_assignee)
+    fake_options = {
+        "latency": args.latency / 1000.0,
+        "jitter": args.jitter / 1000.0,
+        "rate_limit": args.server_rate,
+    }
+    jira = FakeJira(users=jira_users, page_size=args.page_size, **fake_options).start()
+    motion = FakeMotion(users, page_size=args.page_size, **fake_options).start()
+
+    # Seed the issues as last updated a day ago so the warm cycle's
+    # incremental query only picks up the churn.
+    day_ago = time.time() - 86400
+    for issue in issues:
+        jira.add_issue(issue, day_ago)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir, context.Pool(1) as pool:
+            sync_config = {
+                "jira": {
+                    "url": jira.url,
+                    "api": f"{jira.url}/rest/api/2/search",
+                    "user": "bench",
+                    "api_key": "bench-jira-key",
+                    "rate_limit": args.client_rate,
+                },
+                "motion": {
+                    "url": motion.url,
+                    "api_key": "bench-motion-key",
+                    "workspace_id": "bench-workspace",
+                    "rate_limit": args.client_rate,
+                },
+                "sync": {
+                    "mode": args.mode,
+                    "state_file": f"{workdir}/sync_state.db",
+                    "lock_file": f"{workdir}/jiraMotionSync.lock",
+                },
+            }
+            pool.apply(setup_cycle, (sync_config, roster))
+
+            for label in ("cold", "warm"):
+                if label == "warm":
+                    churn(jira, args.churn)
+                jira.reset_stats()
+                motion.reset_stats()
+
+                result = pool.apply(run_cycle)
+                result["issues"] = count
+                result["cycle"] = label
+                result["calls"] = dict(jira.calls + motion.calls)
+                result["server_429s"] = dict(jira.throttled + motion.throttled)
+                results.append(result)
+    finally:
+        jira.stop()
+        motion.stop()
+    return results
+
+
+def print_results(results):
+    print(
+        f"{'issues':>7} {'cycle':<5} {'wall s':>8} {'changes':>8} "
+        f"{'rate wait s':>11} {'429s':>5} {'peak RSS MB':>11}"
+    )
+    for result in results:
+        print(
+            f"{result['issues']:>7} {result['cycle']:<5} {result['wall']:>8.2f} "
+            f"{result['changes'] if result['changes'] is not None else 'error':>8} "
+            f"{result['rate_wait']:>11.2f} {result['throttled']:>5} "
+            f"{result['peak_rss'] / 1024 / 1024:>11.1f}"
+        )
+        calls = ", ".join(
+            f"{endpoint}={count}" for endpoint, count in sorted(result["calls"].items())
+        )
+        print(f"{'':>14}{calls}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark full sync cycles against fake Jira and Motion servers"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument(
+        "--latency", type=float, default=0, help="milliseconds added to each request"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="up to this many extra milliseconds"
+    )
+    parser.add_argument(
+        "--server-rate",
+        type=int,
+        help="requests per minute each fake allows before answering 429",
+    )
+    parser.add_argument(
+        "--client-rate",
+        type=int,
+        default=1000000,
+        help="requests per minute the sync's own rate budget allows",
+    )
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--per-assignee", type=int, default=25)
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=0.01,
+        help="share of issues changed before the warm cycle",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    # Each size runs in a fresh process so peak RSS and the rate buckets
+    # belong to that size alone.
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for count in args.sizes:
+        results.extend(bench_size(count, args, context))
+    print_results(results)
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=2)
@@ -0,0 +1,136 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from reconcile import is_resolved, motion_assignee_id
+from task_index import is_jira_task, jira_key_for_task
+
+
+def task_row(task, key):
+    return (
+        task["id"],
+        key,
+        task.get("updatedTime"),
+        int(is_resolved(task)),
+        motion_assignee_id(task),
+    )
+
+
+class MotionChange:
+    def __init__(self, key, task, field, old, new):
+        self.key = key
+        self.task = task
+        self.field = field
+        self.old = old
+        self.new = new
+
+    def __str__(self):
+        return (
+            f"{self.key} [{self.task['id']}]: {self.field} {self.old!r} -> {self.new!r}"
+        )
+
+
+def task_changes(task, key, row, previous):
+    changes = []
+    if row[3] and not previous["resolved"]:
+        changes.append(MotionChange(key, task, "status", "open", "resolved"))
+    if row[4] is not None and row[4] != previous["assignee_id"]:
+        changes.append(
+            MotionChange(key, task, "assignee", previous["assignee_id"], row[4])
+        )
+    return changes
+
+
+class ChangeCapture:
+    def __init__(self, sync_state):
+        self.sync_state = sync_state
+        self.rows = []
+        self.pending = {}
+        self.changes = []
+        self.stale = []
+
+    def diff(self, snapshot, full=False):
+        stored = self.sync_state.motion_tasks()
+        self.rows = []
+        self.pending = {}
+
+        changes = []
+        for task in snapshot.tasks:
+            key = snapshot.key_for_id.get(task["id"])
+            if key is None or not is_jira_task(task):
+                continue
+
+            # An unchanged updatedTime means nothing to compare, which keeps
+            # the per-cycle work down to the tasks that actually moved.
+            previous = stored.get(task["id"])
+            updated_time = task.get("updatedTime")
+            if (
+                previous is not None
+                and updated_time is not None
+                and previous["updated_time"] == updated_time
+            ):
+                continue
+
+            row = task_row(task, key)
+            # A task seen for the first time only sets the baseline.
+            found = []
+            if previous is not None:
+                found = task_changes(task, key, row, previous)
+
+            if found:
+                changes.extend(found)
+                self.pending[task["id"]] = row
+            else:
+                self.rows.append(row)
+
+        # Only a whole-workspace snapshot can tell a deleted task from one that
+        # simply wasn't fetched.
+        self.stale = []
+        if full:
+            self.stale = list(set(stored) - set(snapshot.by_id))
+        self.changes = changes
+        return changes
+
+    def commit(self, accepted):
+        # A task with any change Jira rejected keeps its old row, so the next
+        # cycle sees the same difference and retries.
+        accepted = set(id(change) for change in accepted)
+        rejected = set(
+            change.task["id"] for change in self.changes if id(change) not in accepted
+        )
+        rows = self.rows + [
+            row for task_id, row in self.pending.items() if task_id not in rejected
+        ]
+        self.sync_state.record_motion_tasks(rows)
+        if self.stale:
+            self.sync_state.forget_motion_tasks(self.stale)
+        self.rows = []
+        self.pending = {}
+        self.changes = []
+        self.stale = []
+
+    def unapplied(self, task, key):
+        # Motion-side changes Jira has not taken yet; writing Jira's state
+        # over the task now would undo them.
+        previous = self.sync_state.motion_task(task["id"])
+        if previous is None:
+            return []
+        return task_changes(task, key, task_row(task, key), previous)
+
+    def remember(self, tasks):
+        # Our own writes must not come back as Motion-side changes.
+        self.sync_state.record_motion_tasks(
+            [task_row(task, jira_key_for_task(task)) for task in tasks]
+        )
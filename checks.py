@@ -0,0 +1,336 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import argparse, contextlib, io, multiprocessing, sys, tempfile, traceback, types
+from fakes import FakeJira, FakeMotion, make_issue, post_webhook
+from urllib.error import HTTPError
+from webhook import WebhookReceiver
+
+CHECKS = {}
+
+app = None
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def check(function):
+    CHECKS[function.__name__] = function
+    return function
+
+
+def expect(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+def roster_fixtures(size):
+    roster = {f"check-account-{n}": f"Check User {n}" for n in range(size)}
+    users = [
+        {
+            "id": f"check-user-{n}",
+            "name": f"Check User {n}",
+            "email": f"check.user.{n}@example.com",
+        }
+        for n in range(size)
+    ]
+    jira_users = [
+        {
+            "accountId": f"check-account-{n}",
+            "displayName": f"Check User {n}",
+            "emailAddress": f"check.user.{n}@example.com",
+        }
+        for n in range(size)
+    ]
+    return roster, users, jira_users
+
+
+def start_sync(workdir, jira, motion, roster, motion_options=None, **sync_options):
+    global app
+
+    # app.py imports its roster from variables.py; each check brings its own.
+    variables = types.ModuleType("variables")
+    variables.assignees = roster
+    sys.modules["variables"] = variables
+
+    import app
+
+    sync_config = {
+        "state_file": f"{workdir}/sync_state.db",
+        "lock_file": f"{workdir}/jiraMotionSync.lock",
+    }
+    sync_config.update(sync_options)
+    app.configure(
+        {
+            "jira": {
+                "url": jira.url,
+                "api": f"{jira.url}/rest/api/2/search",
+                "user": "check",
+                "api_key": "check-jira-key",
+            },
+            "motion": dict(
+                {
+                    "url": motion.url,
+                    "api_key": "check-motion-key",
+                    "workspace_id": "check-workspace",
+                },
+                **(motion_options or {}),
+            ),
+            "sync": sync_config,
+        },
+        roster,
+    )
+    return app.build_issue_fetcher()
+
+
+def quietly(call, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return call(*args)
+
+
+def refill(budget):
+    # Stands in for the wait between cycles.
+    with budget.lock:
+        budget.tokens = budget.capacity
+
+
+def task_counts(motion):
+    counts = {}
+    for task in motion.tasks.values():
+        counts[task["name"]] = counts.get(task["name"], 0) + 1
+    return counts
+
+
+@check
+def webhook_create_does_not_duplicate_queued_creates(workdir):
+    # Creates left in the write queue for lack of budget must not be sent
+    # again once a webhook has created the task outside the queue.
+    roster, users, jira_users = roster_fixtures(1)
+    issues = [
+        make_issue(f"IT-{n}", f"Issue {n}", "check-account-0", "Check User 0")
+        for n in range(1, 66)
+    ]
+    jira = FakeJira(issues, jira_users).start()
+    motion = FakeMotion(users).start()
+    try:
+        issue_fetcher = start_sync(
+            workdir, jira, motion, roster, {"rate_limit": 60}, write_window=0
+        )
+        quietly(app.main, issue_fetcher)
+        expect(len(app.write_queue), "the first cycle should leave creates queued")
+
+        issue = make_issue("IT-66", "Issue 66", "check-account-0", "Check User 0")
+        jira.add_issue(issue)
+        quietly(app.handle_webhook_event, issue_fetcher, "jira:issue_created", issue)
+        for _ in range(2):
+            refill(issue_fetcher.motion_client.budget)
+            quietly(app.main, issue_fetcher)
+
+        duplicates = sorted(
+            name for name, count in task_counts(motion).items() if count > 1
+        )
+        expect(not duplicates, f"duplicated Motion tasks: {duplicates}")
+        expect(len(motion.tasks) == 66, f"expected 66 tasks, found {len(motion.tasks)}")
+    finally:
+        jira.stop()
+        motion.stop()
+
+
+@check
+def failed_creates_are_retried_after_an_outage(workdir):
+    # A create that keeps failing through a Motion outage must not be parked
+    # in the journal for good once Motion recovers.
+    roster, users, jira_users = roster_fixtures(1)
+    issue = make_issue("IT-1", "Issue 1", "check-account-0", "Check User 0")
+    jira = FakeJira([issue], jira_users).start()
+    motion = FakeMotion(users).start()
+    try:
+        issue_fetcher = start_sync(
+            workdir, jira, motion, roster, full_reconcile_hours=0
+        )
+        motion.fail_next("POST /v1/tasks", 5)
+        for _ in range(8):
+            quietly(app.main, issue_fetcher)
+
+        expect(len(motion.tasks) == 1, f"expected 1 task, found {len(motion.tasks)}")
+        pending = app.sync_state.pending_creates()
+        expect(not pending, f"creates still journaled: {pending}")
+    finally:
+        jira.stop()
+        motion.stop()
+
+
+@check
+def motion_completions_are_not_reopened(workdir):
+    # Without motion_to_jira the issue stays open, but completing the task in
+    # Motion is still the user's call; reconciles must not reopen it.
+    roster, users, jira_users = roster_fixtures(1)
+    issue = make_issue("IT-1", "Issue 1", "check-account-0", "Check User 0")
+    jira = FakeJira([issue], jira_users).start()
+    motion = FakeMotion(users).start()
+    try:
+        issue_fetcher = start_sync(
+            workdir, jira, motion, roster, full_reconcile_hours=0
+        )
+        quietly(app.main, issue_fetcher)
+        (task_id,) = motion.tasks
+        motion.edit_task(task_id, status="Completed")
+        quietly(app.main, issue_fetcher)
+        jira.update_issue("IT-1", priority="High")
+        quietly(app.main, issue_fetcher)
+
+        task = motion.tasks[task_id]
+        expect(
+            task["status"]["name"] == "Completed",
+            f"the Motion completion was undone ({task['status']['name']})",
+        )
+        expect(task["priority"] == "HIGH", "the priority change was not synced")
+    finally:
+        jira.stop()
+        motion.stop()
+
+
+@check
+def untransitionable_motion_completions_are_not_undone(workdir):
+    # A Motion completion the Jira workflow cannot follow must stay pending,
+    # not be reverted by the next reconcile or webhook.
+    roster, users, jira_users = roster_fixtures(1)
+    issue = make_issue("IT-1", "Issue 1", "check-account-0", "Check User 0")
+    jira = FakeJira([issue], jira_users, statuses=("To Do", "In Progress")).start()
+    motion = FakeMotion(users).start()
+    try:
+        issue_fetcher = start_sync(
+            workdir, jira, motion, roster, full_reconcile_hours=0, motion_to_jira=True
+        )
+        for _ in range(2):
+            quietly(app.main, issue_fetcher)
+        (task_id,) = motion.tasks
+        motion.edit_task(task_id, status="Completed")
+        quietly(app.main, issue_fetcher)
+
+        jira.update_issue("IT-1", summary="Issue 1 edited")
+        for _ in range(2):
+            quietly(app.main, issue_fetcher)
+        edited = jira.issues["IT-1"]
+        quietly(app.handle_webhook_event, issue_fetcher, "jira:issue_updated", edited)
+
+        status = motion.tasks[task_id]["status"]["name"]
+        expect(status == "Completed", f"the Motion completion was undone ({status})")
+        expect(
+            motion.tasks[task_id]["name"].startswith("Issue 1 ("),
+            "the task was rewritten while its completion was pending",
+        )
+    finally:
+        jira.stop()
+        motion.stop()
+
+
+@check
+def sliced_journal_replay_does_not_duplicate(workdir):
+    # A create whose POST reached Motion but whose id was never recorded must
+    # only be replayed against a snapshot that could contain the task.
+    roster, users, jira_users = roster_fixtures(2)
+    issues = [
+        make_issue(f"IT-{n + 1}", f"Issue {n + 1}", account_id, name)
+        for n, (account_id, name) in enumerate(roster.items())
+    ]
+    jira = FakeJira(issues, jira_users).start()
+    motion = FakeMotion(users).start()
+    try:
+        issue_fetcher = start_sync(
+            workdir, jira, motion, roster, partition={"enabled": True, "max_slice": 1}
+        )
+        for issue in issues:
+            record = app.IssueRecord.from_json(issue)
+            payload = issue_fetcher.build_task_payload(record)
+            app.sync_state.journal_create(record.key, payload, app.fingerprint(record))
+            issue_fetcher.motion_client.create_task(payload)
+
+        for _ in range(3):
+            quietly(app.main, issue_fetcher)
+
+        duplicates = sorted(
+            name for name, count in task_counts(motion).items() if count > 1
+        )
+        expect(not duplicates, f"duplicated Motion tasks: {duplicates}")
+        pending = app.sync_state.pending_creates()
+        expect(not pending, f"creates still journaled: {pending}")
+    finally:
+        jira.stop()
+        motion.stop()
+
+
+@check
+def webhooks_need_the_secret(workdir):
+    try:
+        WebhookReceiver("127.0.0.1", 0, "/jira-webhook", "")
+        raise CheckFailed("a receiver started without a secret")
+    except ValueError:
+        pass
+
+    receiver = WebhookReceiver("127.0.0.1", 0, "/jira-webhook", "check-secret")
+    quietly(receiver.start)
+    url = f"http://127.0.0.1:{receiver.port}/jira-webhook"
+    issue = make_issue("IT-1", "Forged issue")
+    try:
+        for secret in (None, "wrong-secret"):
+            try:
+                post_webhook(url, "jira:issue_deleted", issue, secret)
+                raise CheckFailed(f"accepted an event signed with {secret!r}")
+            except HTTPError as e:
+                expect(e.code == 401, f"expected 401, got {e.code}")
+        expect(receiver.next_event(timeout=0) is None, "queued a forged event")
+
+        status = post_webhook(url, "jira:issue_deleted", issue, "check-secret")
+        expect(status == 202, f"expected 202 for a signed event, got {status}")
+        expect(receiver.next_event(timeout=1) is not None, "dropped a signed event")
+    finally:
+        receiver.stop()
+
+
+def run_check(name):
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            CHECKS[name](workdir)
+        except CheckFailed as e:
+            return str(e)
+        except Exception:
+            return traceback.format_exc()
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run end-to-end sync checks against fake Jira and Motion servers"
+    )
+    parser.add_argument("names", nargs="*", help="checks to run (default: all)")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in CHECKS:
+            parser.error(f"unknown check '{name}'; choose from {', '.join(CHECKS)}")
+
+    # Each check gets a fresh process, since app.py keeps its state in globals.
+    context = multiprocessing.get_context("spawn")
+    failed = 0
+    for name in args.names or list(CHECKS):
+        with context.Pool(1) as pool:
+            error = pool.apply(run_check, (name,))
+        print(f"{'FAIL' if error else 'ok':<5}{name}")
+        if error:
+            print(f"     {error}")
+            failed += 1
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,562 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import argparse, hashlib, hmac, json, random, re, threading, time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+JQL_ORDER_BY = re.compile(r"\s+order\s+by\s+.*$", re.IGNORECASE)
+JQL_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+JQL_CHANGED = re.compile(
+    r'status\s+changed\s+to\s+\((.*)\)\s+after\s+"-(\d+)m"', re.IGNORECASE
+)
+JQL_UPDATED = re.compile(r'updated\s*>=\s*"-(\d+)m"', re.IGNORECASE)
+JQL_IN = re.compile(r"(\w+)\s+(not\s+in|in)\s+\((.*)\)", re.IGNORECASE)
+JQL_EQUALS = re.compile(r'(\w+)\s*(!=|=)\s*"?([^"]*)"?')
+JQL_VALUE = re.compile(r'"([^"]*)"|([^,\s]+)')
+
+
+def make_issue(
+    key,
+    summary,
+    account_id=None,
+    display_name=None,
+    status="To Do",
+    priority="Medium",
+    duedate=None,
+    issue_type="Task",
+):
+    assignee = None
+    if account_id is not None:
+        assignee = {"accountId": account_id, "displayName": display_name or account_id}
+
+    return {
+        "key": key,
+        "fields": {
+            "summary": summary,
+            "assignee": assignee,
+            "status": {"name": status},
+            "priority": {"name": priority},
+            "duedate": duedate,
+            "issuetype": {"name": issue_type},
+        },
+    }
+
+
+def jql_values(text):
+    return [quoted or bare for quoted, bare in JQL_VALUE.findall(text)]
+
+
+def issue_value(issue, field):
+    fields = issue["fields"]
+    field = field.lower()
+    if field in ("key", "issuekey"):
+        return issue["key"]
+    if field == "assignee":
+        return (fields.get("assignee") or {}).get("accountId")
+    if field in ("type", "issuetype"):
+        return (fields.get("issuetype") or {}).get("name")
+    return (fields.get(field) or {}).get("name")
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, each
+    # keep-alive response would stall on the client's delayed ACK.
+    disable_nagle_algorithm = True
+
+    def handle_method(self, method):
+        url = urlparse(self.path)
+        query = {
+            name: values[0] if len(values) == 1 else values
+            for name, values in parse_qs(url.query).items()
+        }
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+
+        status, payload, headers = self.server.fake.dispatch(
+            method, url.path, query, body
+        )
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status == 204:
+            self.end_headers()
+            return
+
+        data = json.dumps(payload).encode("utf-8")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.handle_method("GET")
+
+    def do_POST(self):
+        self.handle_method("POST")
+
+    def do_PATCH(self):
+        self.handle_method("PATCH")
+
+    def do_PUT(self):
+        self.handle_method("PUT")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeServer:
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=None, period=60):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.period = period
+        self.calls = Counter()
+        self.throttled = Counter()
+        self.forced_throttles = 0
+        self.forced_failures = Counter()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.version = 0
+        self.lock = threading.Lock()
+        self.routes = []
+        self.server = None
+        self.thread = None
+        self.url = None
+
+    def route(self, method, name, pattern, handler):
+        self.routes.append((method, name, re.compile(pattern), handler))
+
+    def start(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name=type(self).__name__, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def reset_stats(self):
+        with self.lock:
+            self.calls.clear()
+            self.throttled.clear()
+
+    def throttle_next(self, count=1):
+        with self.lock:
+            self.forced_throttles += count
+
+    def fail_next(self, name, count=1):
+        # The next count calls to the named route answer 500.
+        with self.lock:
+            self.forced_failures[name] += count
+
+    def retry_after(self):
+        # A fixed window per period, like the real APIs' per-minute limits.
+        if self.forced_throttles:
+            self.forced_throttles -= 1
+            return 1.0
+        if self.rate_limit is None:
+            return None
+        now = time.monotonic()
+        if now - self.window_start >= self.period:
+            self.window_start = now
+            self.window_count = 0
+        if self.window_count >= self.rate_limit:
+            return self.window_start + self.period - now
+        self.window_count += 1
+        return None
+
+    def dispatch(self, method, path, query, body):
+        for route_method, name, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if route_method != method or match is None:
+                continue
+
+            if self.latency or self.jitter:
+                time.sleep(self.latency + random.uniform(0, self.jitter))
+            with self.lock:
+                self.calls[name] += 1
+                retry_after = self.retry_after()
+                if retry_after is not None:
+                    self.throttled[name] += 1
+                    headers = {"Retry-After": f"{retry_after:.2f}"}
+                    return 429, {"message": "Too many requests"}, headers
+                if self.forced_failures[name]:
+                    self.forced_failures[name] -= 1
+                    return 500, {"message": "Internal server error"}, {}
+                return handler(query, body, *match.groups())
+        return 404, {"message": f"No fake route for {method} {path}"}, {}
+
+
+class FakeJira(FakeServer):
+    def __init__(
+        self,
+        issues=(),
+        users=(),
+        page_size=100,
+        statuses=("To Do", "In Progress", "Done"),
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.page_size = page_size
+        self.statuses = statuses
+        self.users = {user["accountId"]: user for user in users}
+        self.issues = {}
+        self.updated = {}
+        self.transitions = {}
+        self.results = {}
+        for issue in issues:
+            self.add_issue(issue)
+        self.route("GET", "GET /search", r"/rest/api/\d+/search", self.search)
+        self.route("GET", "GET /user/bulk", r"/rest/api/\d+/user/bulk", self.bulk_users)
+        self.route(
+            "GET",
+            "GET /issue/{key}/transitions",
+            r"/rest/api/\d+/issue/([^/]+)/transitions",
+            self.list_transitions,
+        )
+        self.route(
+            "POST",
+            "POST /issue/{key}/transitions",
+            r"/rest/api/\d+/issue/([^/]+)/transitions",
+            self.transition,
+        )
+        self.route(
+            "PUT",
+            "PUT /issue/{key}/assignee",
+            r"/rest/api/\d+/issue/([^/]+)/assignee",
+            self.assign,
+        )
+
+    def add_issue(self, issue, updated=None):
+        with self.lock:
+            self.issues[issue["key"]] = issue
+            self.updated[issue["key"]] = updated or time.time()
+            self.version += 1
+
+    def update_issue(self, key, **fields):
+        with self.lock:
+            self.set_fields(key, **fields)
+
+    def set_fields(self, key, **fields):
+        issue = self.issues[key]
+        if "status" in fields:
+            self.transitions[key] = (fields["status"], time.time())
+        for name, value in fields.items():
+            if name in ("status", "priority"):
+                value = {"name": value}
+            elif name == "assignee" and value is not None:
+                value = {"accountId": value, "displayName": value}
+            issue["fields"][name] = value
+        self.updated[key] = time.time()
+        self.version += 1
+
+    def clause(self, text):
+        now = time.time()
+        match = JQL_CHANGED.fullmatch(text)
+        if match:
+            statuses = set(jql_values(match.group(1)))
+            since = now - int(match.group(2)) * 60
+
+            def changed(issue):
+                status, at = self.transitions.get(issue["key"], (None, 0))
+                return status in statuses and at > since
+
+            return changed
+
+        match = JQL_UPDATED.fullmatch(text)
+        if match:
+            since = now - int(match.group(1)) * 60
+            return lambda issue: self.updated[issue["key"]] >= since
+
+        match = JQL_IN.fullmatch(text)
+        if match:
+            field, operator, values = match.groups()
+            values = set(jql_values(values))
+            negate = operator.lower() != "in"
+            return lambda issue: (issue_value(issue, field) in values) != negate
+
+        match = JQL_EQUALS.fullmatch(text)
+        if match:
+            field, operator, value = match.groups()
+            negate = operator == "!="
+            return lambda issue: (issue_value(issue, field) == value) != negate
+
+        raise ValueError(f"Unsupported JQL clause: {text}")
+
+    def matching_keys(self, jql, validate):
+        cached = self.results.get(jql)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        clauses = [
+            self.clause(text.strip())
+            for text in JQL_AND.split(JQL_ORDER_BY.sub("", jql.strip()))
+        ]
+        if validate:
+            for text in JQL_AND.split(jql):
+                match = JQL_IN.fullmatch(text.strip())
+                if match and match.group(1).lower() in ("key", "issuekey"):
+                    for key in jql_values(match.group(3)):
+                        if key not in self.issues:
+                            raise ValueError(
+                                f"An issue with key '{key}' does not exist"
+                            )
+
+        keys = [
+            key
+            for key, issue in self.issues.items()
+            if all(clause(issue) for clause in clauses)
+        ]
+        self.results[jql] = (self.version, keys)
+        return keys
+
+    def search(self, query, body):
+        validate = query.get("validateQuery", "strict") not in ("warn", "none")
+        try:
+            keys = self.matching_keys(query.get("jql", ""), validate)
+        except ValueError as e:
+            return 400, {"errorMessages": [str(e)]}, {}
+
+        start_at = int(query.get("startAt", 0))
+        max_results = min(int(query.get("maxResults", 50)), self.page_size)
+        wanted = query.get("fields")
+        wanted = set(wanted.split(",")) if wanted else None
+
+        issues = []
+        for key in keys[start_at : start_at + max_results]:
+            issue = self.issues[key]
+            if wanted is not None:
+                fields = issue["fields"]
+                issue = {
+                    "key": key,
+                    "fields": {name: fields.get(name) for name in wanted},
+                }
+            issues.append(issue)
+        page = {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(keys),
+            "issues": issues,
+        }
+        return 200, page, {}
+
+    def transitions_for(self, key):
+        current = issue_value(self.issues[key], "status")
+        return [
+            {"id": str(n + 1), "name": status, "to": {"name": status}}
+            for n, status in enumerate(self.statuses)
+            if status != current
+        ]
+
+    def list_transitions(self, query, body, key):
+        if key not in self.issues:
+            return 404, {"errorMessages": ["Issue does not exist"]}, {}
+        return 200, {"transitions": self.transitions_for(key)}, {}
+
+    def transition(self, query, body, key):
+        if key not in self.issues:
+            return 404, {"errorMessages": ["Issue does not exist"]}, {}
+        wanted = (body or {}).get("transition", {}).get("id")
+        for transition in self.transitions_for(key):
+            if transition["id"] == wanted:
+                self.set_fields(key, status=transition["to"]["name"])
+                return 204, {}, {}
+        return 400, {"errorMessages": ["Transition is not valid"]}, {}
+
+    def assign(self, query, body, key):
+        if key not in self.issues:
+            return 404, {"errorMessages": ["Issue does not exist"]}, {}
+        self.set_fields(key, assignee=(body or {}).get("accountId"))
+        return 204, {}, {}
+
+    def bulk_users(self, query, body):
+        account_ids = query.get("accountId", [])
+        if isinstance(account_ids, str):
+            account_ids = [account_ids]
+        users = [
+            self.users[account_id]
+            for account_id in account_ids
+            if account_id in self.users
+        ]
+        max_results = int(query.get("maxResults", 10))
+        start_at = int(query.get("startAt", 0))
+        page = users[start_at : start_at + max_results]
+        return (
+            200,
+            {
+                "startAt": start_at,
+                "maxResults": max_results,
+                "total": len(users),
+                "isLast": start_at + max_results >= len(users),
+                "values": page,
+            },
+            {},
+        )
+
+
+class FakeMotion(FakeServer):
+    def __init__(self, users=(), page_size=100, **kwargs):
+        super().__init__(**kwargs)
+        self.page_size = page_size
+        self.users = list(users)
+        self.tasks = {}
+        self.results = {}
+        self.next_id = 1
+        self.route("GET", "GET /v1/users", r"/v1/users", self.list_users)
+        self.route("GET", "GET /v1/tasks", r"/v1/tasks", self.list_tasks)
+        self.route("POST", "POST /v1/tasks", r"/v1/tasks", self.create_task)
+        self.route("GET", "GET /v1/tasks/{id}", r"/v1/tasks/([^/]+)", self.get_task)
+        self.route(
+            "PATCH", "PATCH /v1/tasks/{id}", r"/v1/tasks/([^/]+)", self.update_task
+        )
+
+    def list_users(self, query, body):
+        return 200, {"users": self.users}, {}
+
+    def matching_ids(self, workspace_id, assignee_id):
+        cache_key = (workspace_id, assignee_id)
+        cached = self.results.get(cache_key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+
+        ids = [
+            task_id
+            for task_id, task in self.tasks.items()
+            if (workspace_id is None or task["workspace"]["id"] == workspace_id)
+            and (
+                assignee_id is None
+                or any(user["id"] == assignee_id for user in task["assignees"])
+            )
+        ]
+        self.results[cache_key] = (self.version, ids)
+        return ids
+
+    def list_tasks(self, query, body):
+        ids = self.matching_ids(query.get("workspaceId"), query.get("assigneeId"))
+        start = int(query.get("cursor") or 0)
+        page = [self.tasks[task_id] for task_id in ids[start : start + self.page_size]]
+
+        meta = {"pageSize": self.page_size}
+        if start + self.page_size < len(ids):
+            meta["nextCursor"] = str(start + self.page_size)
+        return 200, {"tasks": page, "meta": meta}, {}
+
+    def get_task(self, query, body, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return 404, {"message": "Not found"}, {}
+        return 200, task, {}
+
+    def set_fields(self, task, body):
+        if "name" in body:
+            task["name"] = body["name"]
+        if "description" in body:
+            task["description"] = body["description"]
+        if "priority" in body:
+            task["priority"] = body["priority"].upper()
+        if "dueDate" in body:
+            task["dueDate"] = body["dueDate"]
+        if "status" in body:
+            resolved = body["status"] == "Completed"
+            task["status"] = {"name": body["status"], "isResolvedStatus": resolved}
+        if "assigneeId" in body:
+            task["assignees"] = [{"id": body["assigneeId"]}]
+        now = time.time()
+        task["updatedTime"] = (
+            f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(now))}"
+            f".{int(now * 1000) % 1000:03d}Z"
+        )
+
+    def create_task(self, query, body):
+        task = {
+            "id": f"task-{self.next_id}",
+            "workspace": {"id": body.get("workspaceId")},
+            "labels": [{"name": label} for label in body.get("labels", [])],
+            "assignees": [],
+            "status": {"name": "Todo", "isResolvedStatus": False},
+        }
+        self.next_id += 1
+        self.set_fields(task, body)
+        self.tasks[task["id"]] = task
+        self.version += 1
+        return 201, task, {}
+
+    def edit_task(self, task_id, **body):
+        # Stands in for someone changing the task in the Motion app.
+        with self.lock:
+            self.set_fields(self.tasks[task_id], body)
+            self.version += 1
+
+    def update_task(self, query, body, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return 404, {"message": "Not found"}, {}
+        self.set_fields(task, body)
+        self.version += 1
+        return 200, task, {}
+
+
+def post_webhook(url, event, issue, secret=None):
+    body = json.dumps({"webhookEvent": event, "issue": issue}).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        signature = hmac.new(secret.encode("utf-8"), body, hashlib.sha256)
+        headers["X-Hub-Signature"] = f"sha256={signature.hexdigest()}"
+
+    with urlopen(Request(url, data=body, headers=headers, method="POST")) as response:
+        return response.status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post a fake Jira webhook event")
+    parser.add_argument("url")
+    parser.add_argument(
+        "event",
+        choices=["jira:issue_created", "jira:issue_updated", "jira:issue_deleted"],
+    )
+    parser.add_argument("key")
+    parser.add_argument("--summary", default="Webhook test issue")
+    parser.add_argument("--account-id")
+    parser.add_argument("--display-name")
+    parser.add_argument("--status", default="To Do")
+    parser.add_argument("--priority", default="Medium")
+    parser.add_argument("--duedate")
+    parser.add_argument("--secret")
+    args = parser.parse_args()
+
+    issue = make_issue(
+        args.key,
+        args.summary,
+        args.account_id,
+        args.display_name,
+        args.status,
+        args.priority,
+        args.duedate,
+    )
+    print(post_webhook(args.url, args.event, issue, args.secret))
@@ -0,0 +1,83 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+
+# Everything the sync reads from an issue; Jira sends nothing else.
+ISSUE_FIELDS = ("summary", "assignee", "priority", "duedate", "status", "issuetype")
+
+
+class IssueRecord:
+    __slots__ = (
+        "key",
+        "summary",
+        "account_id",
+        "display_name",
+        "priority",
+        "duedate",
+        "status",
+        "issue_type",
+    )
+
+    def __init__(
+        self,
+        key,
+        summary=None,
+        account_id=None,
+        display_name=None,
+        priority=None,
+        duedate=None,
+        status=None,
+        issue_type=None,
+    ):
+        self.key = key
+        self.summary = summary
+        self.account_id = account_id
+        self.display_name = display_name
+        self.priority = priority
+        self.duedate = duedate
+        self.status = status
+        self.issue_type = issue_type
+
+    @classmethod
+    def from_json(cls, issue):
+        fields = issue.get("fields") or {}
+        assignee = fields.get("assignee") or {}
+        return cls(
+            issue["key"],
+            fields.get("summary"),
+            assignee.get("accountId"),
+            assignee.get("displayName"),
+            (fields.get("priority") or {}).get("name"),
+            fields.get("duedate"),
+            (fields.get("status") or {}).get("name"),
+            (fields.get("issuetype") or {}).get("name"),
+        )
+
+    def __repr__(self):
+        return f"IssueRecord({self.key!r}, {self.summary!r})"
+
+
+def issue_hook(obj):
+    # The decoder builds objects innermost first, so each issue collapses into
+    # a record as soon as it closes and its field dicts are freed mid-page.
+    if "key" in obj and "fields" in obj:
+        return IssueRecord.from_json(obj)
+    return obj
+
+
+def decode_page(content):
+    return json.loads(content, object_hook=issue_hook)
@@ -0,0 +1,101 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import errno, fcntl, os, socket, time
+
+
+# The kernel drops an flock when its process exits, however it exits, so a
+# crash never leaves a stale lock. The pid and host in the file are for
+# diagnostics and for filesystems without flock support.
+class InstanceLock:
+    def __init__(self, path, standby=False, poll_interval=1):
+        self.path = path
+        self.standby = standby
+        self.poll_interval = poll_interval
+        self.host = socket.gethostname()
+        self.fd = None
+
+    def holder(self):
+        try:
+            fields = os.pread(self.fd, 256, 0).decode("utf-8", "replace").split()
+            return int(fields[0]), fields[1] if len(fields) > 1 else self.host
+        except (IndexError, ValueError, OSError):
+            return None, None
+
+    def holder_alive(self):
+        pid, host = self.holder()
+        if pid is None:
+            return False
+        if host != self.host:
+            # A pid from another host or container says nothing here.
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def try_lock(self):
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+        except OSError as e:
+            if e.errno not in (errno.ENOLCK, errno.EOPNOTSUPP):
+                raise
+            return not self.holder_alive()
+
+    def describe_holder(self):
+        pid, host = self.holder()
+        if pid is None:
+            return "another process"
+        if host != self.host:
+            return f"pid {pid} on {host}"
+        if self.holder_alive():
+            return f"pid {pid}"
+        return f"a child of pid {pid}, which is no longer running"
+
+    def acquire(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        waiting = False
+        while not self.try_lock():
+            if not self.standby:
+                print(
+                    f"The script is already running ({self.describe_holder()}). Exiting."
+                )
+                self.close()
+                return False
+            if not waiting:
+                print(f"Standing by: {self.path} is held by {self.describe_holder()}")
+                waiting = True
+            time.sleep(self.poll_interval)
+
+        if waiting:
+            print(f"Took over {self.path} from the previous instance")
+        record = f"{os.getpid()} {self.host}\n".encode("utf-8")
+        os.ftruncate(self.fd, 0)
+        os.pwrite(self.fd, record, 0)
+        return True
+
+    def close(self):
+        # Never unlink the file: a standby instance may already be waiting on
+        # it, and a new file would let two instances hold "the" lock at once.
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,136 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import contextlib, re, time
+from urllib.parse import urlparse
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+# Object ids would give every task its own time series.
+ID_SEGMENT = re.compile(r"/(tasks|users|issue)/[^/]+")
+
+PHASE_SECONDS = Histogram(
+    "jira_motion_sync_phase_seconds",
+    "Time spent in each phase of a sync cycle",
+    ["phase"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+WRITE_SECONDS = Histogram(
+    "jira_motion_sync_write_seconds",
+    "Time taken by each Motion write, rate-limit waits included",
+    ["kind"],
+)
+REQUESTS = Counter(
+    "jira_motion_sync_api_requests_total",
+    "HTTP requests sent to Jira and Motion",
+    ["api", "method", "endpoint", "status"],
+)
+REQUEST_SECONDS = Histogram(
+    "jira_motion_sync_api_request_seconds",
+    "Latency of HTTP requests to Jira and Motion",
+    ["api", "method", "endpoint"],
+)
+THROTTLED = Counter(
+    "jira_motion_sync_rate_limited_total",
+    "Requests answered with 429 Too Many Requests",
+    ["api"],
+)
+RATE_LIMIT_WAIT = Counter(
+    "jira_motion_sync_rate_limit_wait_seconds_total",
+    "Time spent waiting on the client-side rate budget",
+    ["api"],
+)
+ITEMS = Counter(
+    "jira_motion_sync_items_total",
+    "Motion tasks created, updated or completed",
+    ["action"],
+)
+ERROR_REPORTS = Counter(
+    "jira_motion_sync_error_reports_total",
+    "Error reports sent, coalesced into a repeat, dropped on a full queue or failed",
+    ["outcome"],
+)
+LAST_SUCCESS = Gauge(
+    "jira_motion_sync_last_success_timestamp_seconds",
+    "Unix time the last sync cycle finished without error",
+)
+SINCE_LAST_SUCCESS = Gauge(
+    "jira_motion_sync_seconds_since_last_success",
+    "Seconds since the last sync cycle finished without error",
+)
+
+last_success = time.time()
+SINCE_LAST_SUCCESS.set_function(lambda: time.time() - last_success)
+
+
+def endpoint_label(url):
+    return ID_SEGMENT.sub(r"/\1/{id}", urlparse(url).path)
+
+
+def observe_request(api, method, url, status, seconds):
+    endpoint = endpoint_label(url)
+    REQUESTS.labels(api, method, endpoint, status).inc()
+    REQUEST_SECONDS.labels(api, method, endpoint).observe(seconds)
+    if status == 429:
+        THROTTLED.labels(api).inc()
+
+
+def observe_wait(api, seconds):
+    RATE_LIMIT_WAIT.labels(api).inc(seconds)
+
+
+def count_items(action, count=1):
+    if count:
+        ITEMS.labels(action).inc(count)
+
+
+def count_report(outcome):
+    ERROR_REPORTS.labels(outcome).inc()
+
+
+def cycle_succeeded():
+    global last_success
+
+    last_success = time.time()
+    LAST_SUCCESS.set(last_success)
+
+
+def observe_phase(name, seconds):
+    PHASE_SECONDS.labels(name).observe(seconds)
+
+
+@contextlib.contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(name, time.perf_counter() - started)
+
+
+def timed_write(kind, call):
+    def write():
+        started = time.perf_counter()
+        try:
+            return call()
+        finally:
+            WRITE_SECONDS.labels(kind).observe(time.perf_counter() - started)
+
+    return write
+
+
+def serve(host="127.0.0.1", port=9108):
+    start_http_server(port, host)
+    print(f"Serving Prometheus metrics on {host}:{port}/metrics")
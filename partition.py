@@ -0,0 +1,129 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import math
+from datetime import datetime
+
+
+class RosterPartitioner:
+    def __init__(
+        self,
+        sync_state,
+        roster,
+        requests_per_assignee=3,
+        max_slice=None,
+        promote_share=0.5,
+        smoothing=0.3,
+    ):
+        self.sync_state = sync_state
+        self.roster = roster
+        self.cost = float(requests_per_assignee)
+        self.max_slice = max_slice
+        self.promote_share = promote_share
+        self.smoothing = smoothing
+        self.pending = set()
+        self.size = 1
+        self.delay = 0.0
+
+    def promote(self, account_ids):
+        self.pending.update(
+            account_id for account_id in account_ids if account_id in self.roster
+        )
+
+    def slice_size(self, budget):
+        size = int(budget // self.cost) if self.cost > 0 else len(self.roster)
+        if self.max_slice:
+            size = min(size, self.max_slice)
+        return max(1, min(size, len(self.roster)))
+
+    def next_slice(self, budget):
+        visits = self.sync_state.visits()
+        never = datetime.min
+
+        # Oldest visit first is round-robin once every assignee has been seen,
+        # and puts anyone new to the roster at the front of the line.
+        order = sorted(
+            self.roster,
+            key=lambda account_id: (visits.get(account_id) or {}).get(
+                "visited_at", never
+            ),
+        )
+        self.size = self.slice_size(budget)
+
+        # Changed assignees jump the queue, but only into part of the slice so a
+        # busy roster can't starve the quiet ones.
+        promote_limit = max(1, int(self.size * self.promote_share))
+        promoted = [account_id for account_id in order if account_id in self.pending]
+        promoted = promoted[:promote_limit]
+        rest = [account_id for account_id in order if account_id not in promoted]
+        return promoted + rest[: self.size - len(promoted)]
+
+    def observe(self, account_ids, requests):
+        self.pending.difference_update(account_ids)
+        if not account_ids:
+            return
+        per_assignee = requests / len(account_ids)
+        self.cost = self.smoothing * per_assignee + (1 - self.smoothing) * self.cost
+
+    def staleness(self, now=None):
+        now = now or datetime.utcnow()
+        visits = self.sync_state.visits()
+
+        staleness = {}
+        for account_id in self.roster:
+            visit = visits.get(account_id)
+            if visit is None:
+                staleness[account_id] = (None, None)
+                continue
+            age = (now - visit["visited_at"]).total_seconds()
+            staleness[account_id] = (age, max(age, visit["worst_gap"]))
+        return staleness
+
+    def rotation_cycles(self):
+        return math.ceil(len(self.roster) / max(1, self.size))
+
+    def next_delay(self, budget, min_interval):
+        # A quiet slice says nothing about the rest of the roster, so rotate as
+        # fast as the budget refills for the next slice rather than backing off.
+        self.delay = max(min_interval, budget.seconds_until(self.size * self.cost))
+        return self.delay
+
+    def rotation_seconds(self):
+        return self.rotation_cycles() * self.delay
+
+    def report(self, limit=5, now=None):
+        staleness = self.staleness(now)
+        never = [
+            account_id for account_id, (age, _) in staleness.items() if age is None
+        ]
+        print(
+            f"Roster: {len(self.roster)} assignees in slices of {self.size} "
+            f"(~{self.cost:.1f} Motion requests each), full rotation every "
+            f"{self.rotation_cycles()} cycles, {len(self.pending)} promoted, "
+            f"{len(never)} never synced"
+        )
+
+        seen = [
+            (worst, age, account_id)
+            for account_id, (age, worst) in staleness.items()
+            if age is not None
+        ]
+        for worst, age, account_id in sorted(seen, reverse=True)[:limit]:
+            name = self.roster.get(account_id, account_id)
+            print(
+                f"  {name}: last synced {age / 60:.0f}m ago, "
+                f"worst {worst / 60:.0f}m"
+            )
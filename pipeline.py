@@ -0,0 +1,90 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENCY = 8
+
+
+def concurrency_for(budget, ceiling=MAX_CONCURRENCY):
+    # Anything beyond the bucket's burst size would only queue on its lock.
+    return max(1, min(ceiling, int(budget.capacity)))
+
+
+async def in_thread(executor, semaphore, call, *args):
+    async with semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, call, *args)
+
+
+async def fetch_jira_issues(executor, jira_client, jql_query, page_size=100):
+    semaphore = asyncio.Semaphore(concurrency_for(jira_client.budget))
+    first = await in_thread(
+        executor, semaphore, jira_client.fetch_page, jql_query, 0, page_size
+    )
+    issues = list(first.get("issues", []))
+    total = first.get("total", 0)
+    step = len(issues)
+    if not step or step >= total:
+        return issues
+
+    pages = await asyncio.gather(
+        *(
+            in_thread(
+                executor, semaphore, jira_client.fetch_page, jql_query, start, step
+            )
+            for start in range(step, total, step)
+        )
+    )
+    for page in pages:
+        issues.extend(page.get("issues", []))
+    return issues
+
+
+async def no_issues():
+    return []
+
+
+async def fetch_cycle_inputs(jira_client, motion_client, jql_query, closed_query=None):
+    workers = concurrency_for(jira_client.budget) + 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        loop = asyncio.get_running_loop()
+        snapshot, jira_issues, closed_issues = await asyncio.gather(
+            loop.run_in_executor(executor, motion_client.fetch_snapshot),
+            fetch_jira_issues(executor, jira_client, jql_query),
+            (
+                fetch_jira_issues(executor, jira_client, closed_query)
+                if closed_query is not None
+                else no_issues()
+            ),
+        )
+    return snapshot, jira_issues, closed_issues
+
+
+async def run_writes_async(calls, budget):
+    workers = concurrency_for(budget)
+    semaphore = asyncio.Semaphore(workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return await asyncio.gather(
+            *(in_thread(executor, semaphore, call) for call in calls)
+        )
+
+
+def run_writes(calls, budget=None, concurrent=False):
+    if concurrent:
+        return asyncio.run(run_writes_async(calls, budget))
+    return [call() for call in calls]
@@ -0,0 +1,69 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import cProfile, os, pstats, tracemalloc
+from datetime import datetime
+
+
+class CycleProfiler:
+    def __init__(self, directory="profiles", frames=25, top=15):
+        self.directory = directory
+        self.frames = frames
+        self.top = top
+        self.cycle = 0
+        self.profile = None
+        self.previous = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            os.makedirs(self.directory, exist_ok=True)
+            tracemalloc.start(self.frames)
+        self.cycle += 1
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        if self.profile is None:
+            return
+        self.profile.disable()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, pstats.__file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ]
+        )
+
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        prefix = os.path.join(self.directory, f"cycle-{self.cycle:04d}-{stamp}")
+        self.profile.dump_stats(f"{prefix}.prof")
+        snapshot.dump(f"{prefix}.tracemalloc")
+
+        current, peak = tracemalloc.get_traced_memory()
+        print(
+            f"Profiled cycle {self.cycle} to {prefix}.prof/.tracemalloc "
+            f"(traced memory {current / 1024 / 1024:.1f} MB, "
+            f"peak {peak / 1024 / 1024:.1f} MB)"
+        )
+        pstats.Stats(self.profile).sort_stats("cumulative").print_stats(self.top)
+
+        # Growth against the previous cycle is what points at a leak.
+        if self.previous is not None:
+            for stat in snapshot.compare_to(self.previous, "lineno")[: self.top]:
+                print(stat)
+        self.previous = snapshot
+        tracemalloc.reset_peak()
+        self.profile = None
@@ -0,0 +1,197 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading, time
+from email.utils import parsedate_to_datetime
+from metrics import observe_request, observe_wait
+
+buckets = {}
+buckets_lock = threading.Lock()
+
+
+def parse_retry_after(value):
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_reset(value):
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except ValueError:
+        return parse_retry_after(value)
+    # Some APIs send an epoch timestamp, others a number of seconds.
+    if value > 1e9:
+        return max(0.0, value - time.time())
+    return max(0.0, value)
+
+
+def header_value(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class TokenBucket:
+    def __init__(self, name, rate, period=60):
+        self.name = name
+        self.capacity = float(rate)
+        self.fill_rate = rate / float(period)
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.fill_rate
+        )
+        self.updated = now
+
+    def _wait_time(self, now):
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.fill_rate
+
+    def remaining(self):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return 0
+            return int(self.tokens)
+
+    def seconds_until(self, tokens):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            tokens = min(tokens, self.capacity)
+            blocked = max(0.0, self.blocked_until - now)
+            if now < self.blocked_until:
+                return blocked + tokens / self.fill_rate
+            return max(0.0, (tokens - self.tokens) / self.fill_rate)
+
+    def seconds_until_available(self):
+        with self.lock:
+            return self._wait_time(time.monotonic())
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                wait = self._wait_time(time.monotonic())
+                if wait <= 0:
+                    self.tokens -= 1
+                    self.requests += 1
+                    return
+            self.waited += wait
+            observe_wait(self.name, wait)
+            time.sleep(wait)
+
+    def block_for(self, seconds):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def observe(self, response, attempt=0):
+        headers = response.headers
+        remaining = header_value(
+            headers, "X-RateLimit-Remaining", "RateLimit-Remaining"
+        )
+        reset = header_value(headers, "X-RateLimit-Reset", "RateLimit-Reset")
+
+        if response.status_code == 429:
+            self.throttled += 1
+            retry_after = parse_retry_after(headers.get("Retry-After"))
+            if retry_after is None:
+                retry_after = parse_reset(reset)
+            if retry_after is None:
+                # No hint from the server: back off exponentially from the
+                # steady-state spacing, never longer than one full period.
+                spacing = 1 / self.fill_rate
+                retry_after = min(spacing * 2**attempt, self.capacity * spacing)
+            self.block_for(retry_after)
+            return
+
+        if remaining is None:
+            return
+        try:
+            remaining = float(remaining)
+        except ValueError:
+            return
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+        if remaining <= 0:
+            reset_in = parse_reset(reset)
+            if reset_in:
+                self.block_for(reset_in)
+
+
+def bucket_for(api_key, name, rate, period=60):
+    with buckets_lock:
+        bucket = buckets.get(api_key)
+        if bucket is None:
+            bucket = TokenBucket(name, rate, period)
+            buckets[api_key] = bucket
+        return bucket
+
+
+def send(bucket, method, url, max_retries=3, **kwargs):
+    attempt = 0
+    while True:
+        bucket.acquire()
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = method(url, **kwargs)
+            status = response.status_code
+        finally:
+            observe_request(
+                bucket.name,
+                method.__name__.upper(),
+                url,
+                status,
+                time.perf_counter() - started,
+            )
+        bucket.observe(response, attempt)
+
+        if response.status_code != 429 or attempt >= max_retries:
+            return response
+
+        print(
+            f"Rate limit exceeded for {bucket.name}. "
+            f"Retrying in {bucket.seconds_until_available():.0f} seconds..."
+        )
+        attempt += 1
@@ -0,0 +1,129 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from datetime import datetime
+
+PRIORITY_MAP = {"Highest": "ASAP", "Lowest": "Low"}
+
+
+def motion_priority(issue):
+    priority_name = issue.priority or "Medium"
+    return PRIORITY_MAP.get(priority_name, priority_name)
+
+
+def jira_assignee(issue):
+    if issue.account_id is None and issue.display_name is None:
+        return None, "Not Assigned"
+    return issue.account_id, issue.display_name or "Not Assigned"
+
+
+def motion_assignee_id(task):
+    assignee_list = task.get("assignees") or []
+    return assignee_list[0].get("id") if assignee_list else None
+
+
+def is_resolved(task):
+    status = task.get("status") or {}
+    if isinstance(status, str):
+        return status == "Completed"
+    return bool(status.get("isResolvedStatus")) or status.get("name") == "Completed"
+
+
+class PlannedChange:
+    def __init__(self, key, task, issue):
+        self.key = key
+        self.task = task
+        self.issue = issue
+        self.fields = {}
+        self.payload = {}
+
+    def set(self, field, old, new, payload):
+        self.fields[field] = (old, new)
+        self.payload.update(payload)
+
+    def __str__(self):
+        diffs = ", ".join(
+            f"{field} {old!r} -> {new!r}" for field, (old, new) in self.fields.items()
+        )
+        return f"{self.key} [{self.task['id']}]: {diffs}"
+
+
+class Reconciler:
+    def __init__(self, motion_client, directory):
+        self.motion_client = motion_client
+        self.directory = directory
+        self.unmapped = set()
+
+    def motion_user_for_issue(self, issue):
+        account_id, display_name = jira_assignee(issue)
+        motion_user_id = self.directory.motion_user_id(account_id, display_name)
+        if motion_user_id is None:
+            self.unmapped.add(display_name)
+        return motion_user_id
+
+    def plan_task(self, key, task, issue):
+        change = PlannedChange(key, task, issue)
+
+        current_assignee = motion_assignee_id(task)
+        wanted_assignee = self.motion_user_for_issue(issue)
+        if wanted_assignee is not None and wanted_assignee != current_assignee:
+            change.set(
+                "assignee",
+                current_assignee,
+                wanted_assignee,
+                {"assigneeId": wanted_assignee},
+            )
+
+        # Status is never planned: a task completed in Motion stays completed
+        # while its issue is open, and closing the issue completes the task.
+        current_priority = task.get("priority") or ""
+        wanted_priority = motion_priority(issue)
+        if current_priority.upper() != wanted_priority.upper():
+            change.set(
+                "priority",
+                current_priority,
+                wanted_priority,
+                {"priority": wanted_priority},
+            )
+
+        duedate_str = issue.duedate
+        current_due = (task.get("dueDate") or "")[:10]
+        if duedate_str is not None and duedate_str != current_due:
+            due = datetime.strptime(duedate_str, "%Y-%m-%d").isoformat()
+            change.set("dueDate", current_due or None, duedate_str, {"dueDate": due})
+
+        return change if change.fields else None
+
+    def plan(self, tasks_by_key, issues_by_key):
+        self.unmapped = set()
+        changes = []
+        for key, task in tasks_by_key.items():
+            issue = issues_by_key.get(key)
+            if issue is None:
+                continue
+            change = self.plan_task(key, task, issue)
+            if change is not None:
+                changes.append(change)
+        return changes
+
+    def apply(self, changes):
+        applied = []
+        for change in changes:
+            result = self.motion_client.update_task(change.task["id"], change.payload)
+            if result:
+                change.task.update(result)
+                applied.append(change)
+        return applied
@@ -0,0 +1,140 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import queue, threading, time
+from metrics import count_report
+from ratebudget import bucket_for, send
+
+
+class ErrorReporter:
+    def __init__(
+        self,
+        url,
+        session,
+        app="Jira/Motion Sync",
+        max_queue=1000,
+        window=300,
+        flush_interval=5,
+        batch_size=20,
+        rate_limit=30,
+    ):
+        self.url = url
+        self.session = session
+        self.app = app
+        self.window = window
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.budget = bucket_for(url, "jira-log-api", rate_limit)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pending = {}
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.dropped_seen = 0
+        self.failed = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self._run, name="error-reporter", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def close(self, timeout=5):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.dropped or self.failed:
+            print(
+                f"Error reporter: {self.sent} sent, {self.coalesced} coalesced, "
+                f"{self.dropped} dropped, {self.failed} failed"
+            )
+
+    def report(self, function, message):
+        try:
+            self.queue.put_nowait((function, str(message)))
+        except queue.Full:
+            self.dropped += 1
+            count_report("dropped")
+
+    def _collect(self, function, message):
+        entry = self.pending.get((function, message))
+        if entry is None:
+            self.pending[(function, message)] = {"count": 1, "last_sent": None}
+        else:
+            if entry["count"]:
+                self.coalesced += 1
+                count_report("coalesced")
+            entry["count"] += 1
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        while not self.stopping.is_set() or not self.queue.empty():
+            timeout = max(0.0, next_flush - time.monotonic())
+            try:
+                self._collect(*self.queue.get(timeout=timeout))
+            except queue.Empty:
+                pass
+
+            if time.monotonic() >= next_flush or self.stopping.is_set():
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+        self._flush(force=True)
+
+    def _flush(self, force=False):
+        now = time.monotonic()
+        # Drops happen on the caller's thread, so they are announced here.
+        dropped = self.dropped - self.dropped_seen
+        if dropped:
+            self.dropped_seen += dropped
+            print(f"Dropped {dropped} error report(s): the report queue was full")
+
+        batch = []
+        for key, entry in list(self.pending.items()):
+            due = entry["last_sent"] is None or now - entry["last_sent"] >= self.window
+            if entry["count"] and (due or force):
+                batch.append((key, entry))
+            elif not entry["count"] and now - entry["last_sent"] >= self.window:
+                del self.pending[key]
+
+        for (function, message), entry in batch[: self.batch_size]:
+            if entry["count"] > 1:
+                message = f"{message}\n(repeated {entry['count']} times)"
+            self._send(function, message)
+            entry["count"] = 0
+            entry["last_sent"] = now
+
+    def _send(self, function, message):
+        params = {
+            "app": self.app,
+            "level": "ERR",
+            "function": function,
+            "msg": message,
+        }
+        try:
+            response = send(
+                self.budget, self.session.get, self.url, max_retries=1, params=params
+            )
+            response.raise_for_status()
+            self.sent += 1
+            count_report("sent")
+        except Exception as e:
+            self.failed += 1
+            count_report("failed")
+            print(f"Failed to send error report: {e}")
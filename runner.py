@@ -0,0 +1,145 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import multiprocessing, os, signal, time
+
+# Per-target values override the matching top-level section key by key.
+SECTIONS = ("jira", "motion", "http", "sync", "schedule", "webhook", "metrics")
+
+
+def shard_path(path, name):
+    root, ext = os.path.splitext(path)
+    return f"{root}_{name}{ext}"
+
+
+def find_target(config, name):
+    for target in config.get("targets") or []:
+        if target.get("name") == name:
+            return target
+    raise KeyError(f"Unknown sync target '{name}'")
+
+
+def target_config(config, target):
+    merged = {key: value for key, value in config.items() if key != "targets"}
+    for key, value in target.items():
+        if key in ("name", "assignees"):
+            continue
+        if key in SECTIONS:
+            merged[key] = {**(merged.get(key) or {}), **(value or {})}
+        else:
+            merged[key] = value
+
+    # Shards must never share a state file or a lock, so anything the target
+    # doesn't set explicitly gets the target name folded into it.
+    name = target["name"]
+    target_sync = target.get("sync") or {}
+    sync_config = dict(merged.get("sync") or {})
+    if "state_file" not in target_sync:
+        sync_config["state_file"] = shard_path(
+            sync_config.get("state_file", "sync_state.db"), name
+        )
+    if "lock_file" not in target_sync:
+        sync_config["lock_file"] = shard_path(
+            sync_config.get("lock_file", "/tmp/jiraMotionSync.lock"), name
+        )
+    merged["sync"] = sync_config
+
+    # Each target process serves its own metrics, so each needs its own port.
+    target_metrics = target.get("metrics") or {}
+    if merged.get("metrics") and "port" not in target_metrics:
+        index = (config.get("targets") or []).index(target)
+        metrics_config = dict(merged["metrics"])
+        metrics_config["port"] = metrics_config.get("port", 9108) + index
+        merged["metrics"] = metrics_config
+    return merged
+
+
+def run_shard(shard_config, roster):
+    import app
+
+    app.configure(shard_config, roster)
+    app.run()
+
+
+class Shard:
+    def __init__(self, target, config, restart_delay):
+        self.name = target["name"]
+        self.config = target_config(config, target)
+        self.roster = target.get("assignees")
+        self.process = None
+        self.started = 0.0
+        self.restart_delay = restart_delay
+        self.restart_at = 0.0
+        self.restarts = 0
+
+    def start(self, context):
+        self.process = context.Process(
+            target=run_shard,
+            args=(self.config, self.roster),
+            name=f"jira-motion-sync-{self.name}",
+        )
+        self.process.start()
+        self.started = time.monotonic()
+        print(f"Started sync target '{self.name}' (pid {self.process.pid})")
+
+
+def supervise(config, restart_delay=5, max_restart_delay=300):
+    context = multiprocessing.get_context("spawn")
+    shards = [
+        Shard(target, config, restart_delay) for target in config.get("targets") or []
+    ]
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        now = time.monotonic()
+        for shard in shards:
+            if shard.process is not None:
+                if shard.process.is_alive():
+                    continue
+
+                # Back off a shard that keeps crashing, but give one that ran
+                # for a good while a quick restart.
+                ran_for = now - shard.started
+                if ran_for > max_restart_delay:
+                    shard.restart_delay = restart_delay
+                else:
+                    shard.restart_delay = min(
+                        max_restart_delay, shard.restart_delay * 2
+                    )
+                print(
+                    f"Sync target '{shard.name}' exited with code "
+                    f"{shard.process.exitcode} after {ran_for:.0f}s; "
+                    f"restarting in {shard.restart_delay}s"
+                )
+                shard.process = None
+                shard.restart_at = now + shard.restart_delay
+                shard.restarts += 1
+            elif now >= shard.restart_at:
+                shard.start(context)
+        time.sleep(1)
+
+    for shard in shards:
+        if shard.process is not None and shard.process.is_alive():
+            shard.process.terminate()
+    for shard in shards:
+        if shard.process is not None:
+            shard.process.join(10)
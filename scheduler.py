@@ -0,0 +1,46 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+class CycleScheduler:
+    def __init__(self, min_interval=60, max_interval=900, backoff=2.0, smoothing=0.3):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.interval = min_interval
+        self.change_rate = 0.0
+
+    def observe(self, changes):
+        changes = changes or 0
+        self.change_rate = (
+            self.smoothing * changes + (1 - self.smoothing) * self.change_rate
+        )
+
+        # Poll at the floor while anything is moving, hold there while the
+        # recent change rate is still high, then back off geometrically
+        # through quiet cycles until we reach the ceiling.
+        if changes:
+            self.interval = self.min_interval
+        elif self.change_rate < 1:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def next_delay(self, changes, budgets=(), reserve=1):
+        self.observe(changes)
+
+        refill = max([budget.seconds_until(reserve) for budget in budgets] or [0.0])
+        return max(self.interval, refill)
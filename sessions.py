@@ -0,0 +1,100 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# POST is left out on purpose: a create that timed out after reaching Motion
+# must not be sent twice. Connection errors are still retried for every method.
+RETRY_METHODS = frozenset(["GET", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"])
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def build_session(
+    pool_size=10,
+    connect_timeout=5,
+    read_timeout=30,
+    retries=3,
+    backoff_factor=0.5,
+):
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=RETRY_METHODS,
+        raise_on_status=False,
+        # 429s belong to the token bucket, which honors Retry-After itself.
+        respect_retry_after_header=False,
+    )
+    adapter = TimeoutHTTPAdapter(
+        (connect_timeout, read_timeout),
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate"})
+    return session
+
+
+def session_from_config(http_config):
+    http_config = http_config or {}
+    return build_session(
+        http_config.get("pool_size", 10),
+        http_config.get("connect_timeout", 5),
+        http_config.get("read_timeout", 30),
+        http_config.get("retries", 3),
+        http_config.get("backoff_factor", 0.5),
+    )
+
+
+def session_stats(session):
+    stats = {}
+    # The same adapter is mounted for http:// and https://.
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            host = f"{pool.host}:{pool.port}" if pool.port else pool.host
+            host_stats = stats.setdefault(host, {"requests": 0, "connections": 0})
+            host_stats["requests"] += pool.num_requests
+            host_stats["connections"] += pool.num_connections
+
+    for host_stats in stats.values():
+        host_stats["reused"] = max(
+            0, host_stats["requests"] - host_stats["connections"]
+        )
+    return stats
@@ -0,0 +1,281 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib, json, sqlite3
+from datetime import datetime, timedelta
+
+
+def fingerprint(issue):
+    content = [
+        issue.summary,
+        issue.account_id,
+        issue.priority,
+        issue.duedate,
+        issue.status,
+    ]
+    return hashlib.sha1(json.dumps(content).encode("utf-8")).hexdigest()
+
+
+class SyncState:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "jira_key TEXT PRIMARY KEY, "
+            "motion_task_id TEXT NOT NULL, "
+            "fingerprint TEXT, "
+            "synced_at TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS creates ("
+            "jira_key TEXT PRIMARY KEY, "
+            "payload TEXT NOT NULL, "
+            "fingerprint TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "queued_at TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS visits ("
+            "account_id TEXT PRIMARY KEY, "
+            "visited_at TEXT NOT NULL, "
+            "worst_gap REAL NOT NULL DEFAULT 0)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS motion_tasks ("
+            "task_id TEXT PRIMARY KEY, "
+            "jira_key TEXT, "
+            "updated_time TEXT, "
+            "resolved INTEGER NOT NULL, "
+            "assignee_id TEXT)"
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, jira_key):
+        row = self.conn.execute(
+            "SELECT motion_task_id, fingerprint, synced_at FROM tasks WHERE jira_key = ?",
+            (jira_key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"motion_task_id": row[0], "fingerprint": row[1], "synced_at": row[2]}
+
+    def task_ids(self):
+        return dict(self.conn.execute("SELECT jira_key, motion_task_id FROM tasks"))
+
+    def fingerprints(self):
+        return dict(self.conn.execute("SELECT jira_key, fingerprint FROM tasks"))
+
+    def record(self, jira_key, motion_task_id, fingerprint):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)",
+            (jira_key, motion_task_id, fingerprint, datetime.utcnow().isoformat()),
+        )
+        self.conn.commit()
+
+    def record_many(self, rows):
+        # Rows are (jira_key, motion_task_id, fingerprint); unchanged ones are
+        # skipped so a quiet full reconcile writes nothing.
+        stored = {
+            row[0]: (row[1], row[2])
+            for row in self.conn.execute(
+                "SELECT jira_key, motion_task_id, fingerprint FROM tasks"
+            )
+        }
+        synced_at = datetime.utcnow().isoformat()
+        changed = [
+            (jira_key, motion_task_id, fingerprint, synced_at)
+            for jira_key, motion_task_id, fingerprint in rows
+            if stored.get(jira_key) != (motion_task_id, fingerprint)
+        ]
+        if changed:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)", changed
+                )
+        return len(changed)
+
+    def forget_many(self, jira_keys):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM tasks WHERE jira_key = ?",
+                [(jira_key,) for jira_key in jira_keys],
+            )
+
+    def forget(self, jira_key):
+        self.conn.execute("DELETE FROM tasks WHERE jira_key = ?", (jira_key,))
+        self.conn.commit()
+
+    def journal_create(self, jira_key, payload, fingerprint):
+        self.conn.execute(
+            "INSERT INTO creates (jira_key, payload, fingerprint, queued_at) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (jira_key) DO UPDATE SET "
+            "payload = excluded.payload, fingerprint = excluded.fingerprint, "
+            "attempts = 0",
+            (
+                jira_key,
+                json.dumps(payload),
+                fingerprint,
+                datetime.utcnow().isoformat(),
+            ),
+        )
+        self.conn.commit()
+
+    def journaled(self, jira_key):
+        row = self.conn.execute(
+            "SELECT 1 FROM creates WHERE jira_key = ?", (jira_key,)
+        ).fetchone()
+        return row is not None
+
+    def pending_creates(self):
+        rows = self.conn.execute(
+            "SELECT jira_key, payload, fingerprint, attempts, queued_at FROM creates "
+            "ORDER BY queued_at"
+        )
+        return [
+            {
+                "jira_key": row[0],
+                "payload": json.loads(row[1]),
+                "fingerprint": row[2],
+                "attempts": row[3],
+                "queued_at": row[4],
+            }
+            for row in rows
+        ]
+
+    def finish_create(self, jira_key, motion_task_id, fingerprint):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?)",
+                (jira_key, motion_task_id, fingerprint, datetime.utcnow().isoformat()),
+            )
+            self.conn.execute("DELETE FROM creates WHERE jira_key = ?", (jira_key,))
+
+    def fail_create(self, jira_key):
+        self.conn.execute(
+            "UPDATE creates SET attempts = attempts + 1 WHERE jira_key = ?",
+            (jira_key,),
+        )
+        self.conn.commit()
+        row = self.conn.execute(
+            "SELECT attempts FROM creates WHERE jira_key = ?", (jira_key,)
+        ).fetchone()
+        return row[0] if row is not None else 0
+
+    def drop_create(self, jira_key):
+        self.conn.execute("DELETE FROM creates WHERE jira_key = ?", (jira_key,))
+        self.conn.commit()
+
+    def visits(self):
+        rows = self.conn.execute("SELECT account_id, visited_at, worst_gap FROM visits")
+        return {
+            row[0]: {"visited_at": datetime.fromisoformat(row[1]), "worst_gap": row[2]}
+            for row in rows
+        }
+
+    def mark_visited(self, account_ids, started):
+        visits = self.visits()
+        with self.conn:
+            for account_id in account_ids:
+                visit = visits.get(account_id)
+                worst_gap = 0.0
+                if visit is not None:
+                    gap = (started - visit["visited_at"]).total_seconds()
+                    worst_gap = max(visit["worst_gap"], gap)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO visits VALUES (?, ?, ?)",
+                    (account_id, started.isoformat(), worst_gap),
+                )
+
+    def motion_tasks(self):
+        rows = self.conn.execute(
+            "SELECT task_id, jira_key, updated_time, resolved, assignee_id "
+            "FROM motion_tasks"
+        )
+        return {
+            row[0]: {
+                "jira_key": row[1],
+                "updated_time": row[2],
+                "resolved": bool(row[3]),
+                "assignee_id": row[4],
+            }
+            for row in rows
+        }
+
+    def motion_task(self, task_id):
+        row = self.conn.execute(
+            "SELECT jira_key, updated_time, resolved, assignee_id FROM motion_tasks "
+            "WHERE task_id = ?",
+            (task_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "jira_key": row[0],
+            "updated_time": row[1],
+            "resolved": bool(row[2]),
+            "assignee_id": row[3],
+        }
+
+    def record_motion_tasks(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO motion_tasks VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def forget_motion_tasks(self, task_ids):
+        with self.conn:
+            self.conn.executemany(
+                "DELETE FROM motion_tasks WHERE task_id = ?",
+                [(task_id,) for task_id in task_ids],
+            )
+
+    def get_meta(self, name):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, str(value))
+        )
+        self.conn.commit()
+
+    def last_run(self):
+        value = self.get_meta("last_run")
+        return datetime.fromisoformat(value) if value else None
+
+    def last_full_run(self):
+        value = self.get_meta("last_full_run")
+        return datetime.fromisoformat(value) if value else None
+
+    def full_reconcile_due(self, interval_hours):
+        last_full_run = self.last_full_run()
+        if self.last_run() is None or last_full_run is None:
+            return True
+        return datetime.utcnow() - last_full_run >= timedelta(hours=interval_hours)
+
+    def mark_run(self, started, full):
+        self.set_meta("last_run", started.isoformat())
+        if full:
+            self.set_meta("last_full_run", started.isoformat())
@@ -0,0 +1,41 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import re
+
+# Motion tasks are created as "{summary} ({key})" with the browse link as the
+# description, so either one identifies the Jira issue behind a task.
+KEY_IN_NAME = re.compile(r"\(([A-Z][A-Z0-9_]*-\d+)\)\s*$")
+KEY_IN_LINK = re.compile(r"/browse/([A-Z][A-Z0-9_]*-\d+)")
+
+
+def jira_key_for_task(task):
+    match = KEY_IN_NAME.search(task.get("name") or "")
+    if match is None:
+        match = KEY_IN_LINK.search(task.get("description") or "")
+    return match.group(1) if match else None
+
+
+def is_jira_task(task):
+    for label in task.get("labels") or []:
+        name = label.get("name") if isinstance(label, dict) else label
+        if name == "JIRA":
+            return True
+    return False
+
+
+def index_issues_by_key(issues):
+    return {issue.key: issue for issue in issues}
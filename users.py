@@ -0,0 +1,171 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json, threading, time
+from state import SyncState
+
+
+def index_users(users):
+    by_id = {}
+    by_name = {}
+    by_email = {}
+    for user in users:
+        by_id[user.get("id")] = user
+        if user.get("name"):
+            by_name.setdefault(user["name"], user)
+        if user.get("email"):
+            by_email.setdefault(user["email"].lower(), user)
+    return by_id, by_name, by_email
+
+
+class UserDirectory:
+    def __init__(
+        self,
+        motion_client,
+        jira_client,
+        assignees,
+        state_file=None,
+        ttl=3600,
+        retry_interval=60,
+    ):
+        self.motion_client = motion_client
+        self.jira_client = jira_client
+        self.assignees = assignees
+        self.state_file = state_file
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.by_id = {}
+        self.by_name = {}
+        self.by_email = {}
+        self.jira_emails = {}
+        self.fetched_at = 0.0
+        self.refreshes = 0
+        self.failures = 0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def expires_in(self):
+        return self.fetched_at + self.ttl - time.time()
+
+    def load(self, users, jira_emails, fetched_at):
+        by_id, by_name, by_email = index_users(users)
+        # Swap whole dicts so lookups from other threads never see a partial
+        # index.
+        self.by_id, self.by_name, self.by_email = by_id, by_name, by_email
+        self.jira_emails = jira_emails
+        self.fetched_at = fetched_at
+
+    def stored(self, saved=None):
+        # The refresh thread can't share the main thread's sqlite connection,
+        # so each read or write opens its own.
+        store = SyncState(self.state_file)
+        try:
+            if saved is None:
+                return store.get_meta("user_directory")
+            store.set_meta("user_directory", json.dumps(saved))
+        finally:
+            store.close()
+
+    def restore(self):
+        if self.state_file is None:
+            return False
+        saved = self.stored()
+        if not saved:
+            return False
+        saved = json.loads(saved)
+        if time.time() - saved["fetched_at"] >= self.ttl:
+            return False
+        self.load(saved["users"], saved["jira_emails"], saved["fetched_at"])
+        return True
+
+    def refresh(self):
+        try:
+            users = self.motion_client.fetch_users()
+            if users is None:
+                raise RuntimeError("Failed to fetch Motion users.")
+            # Emails only improve matching, so keep the last set if Jira fails.
+            jira_emails = self.jira_client.fetch_user_emails(list(self.assignees))
+            if jira_emails is None:
+                jira_emails = self.jira_emails
+            fetched_at = time.time()
+            self.load(users, jira_emails, fetched_at)
+            self.refreshes += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"Failed to refresh the Motion user directory: {e}")
+            return False
+
+        if self.state_file is not None:
+            self.stored(
+                {"users": users, "jira_emails": jira_emails, "fetched_at": fetched_at}
+            )
+        return True
+
+    def start(self):
+        if not self.restore():
+            self.refresh()
+        self.thread = threading.Thread(
+            target=self._run, name="motion-user-directory", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+
+    def _run(self):
+        while True:
+            delay = max(0.0, self.expires_in())
+            if self.stopping.wait(delay):
+                return
+            if not self.refresh():
+                # Keep serving the old directory and try again soon.
+                self.fetched_at = time.time() - self.ttl + self.retry_interval
+
+    def user(self, motion_user_id):
+        return self.by_id.get(motion_user_id)
+
+    def user_id(self, name):
+        user = self.by_name.get(name)
+        return user.get("id") if user is not None else None
+
+    def user_for_email(self, email):
+        if not email:
+            return None
+        return self.by_email.get(email.lower())
+
+    def jira_account_id(self, motion_user_id):
+        for account_id in self.assignees:
+            if self.motion_user_id(account_id) == motion_user_id:
+                return account_id
+        return None
+
+    def motion_user_id(self, account_id, display_name=None):
+        # An explicit roster entry wins, then the Jira account's email, then
+        # whatever name Jira shows for the assignee.
+        mapped_name = self.assignees.get(account_id)
+        if mapped_name is not None:
+            motion_user_id = self.user_id(mapped_name)
+            if motion_user_id is not None:
+                return motion_user_id
+
+        user = self.user_for_email(self.jira_emails.get(account_id))
+        if user is not None:
+            return user.get("id")
+
+        if display_name is not None:
+            return self.user_id(display_name)
+        return None
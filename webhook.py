@@ -0,0 +1,108 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib, hmac, json, queue, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+WEBHOOK_EVENTS = ("jira:issue_created", "jira:issue_updated", "jira:issue_deleted")
+
+
+def valid_signature(secret, body, signature):
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature[len("sha256=") :], expected)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        receiver = self.server.receiver
+        url = urlparse(self.path)
+        if url.path != receiver.path:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+
+        # Signed webhooks carry an HMAC; admin-registered ones can only pass
+        # the shared secret as a query parameter.
+        token = parse_qs(url.query).get("secret", [None])[0]
+        signed = valid_signature(
+            receiver.secret, body, self.headers.get("X-Hub-Signature")
+        )
+        if not signed and not (token and hmac.compare_digest(token, receiver.secret)):
+            self.send_response(401)
+            self.end_headers()
+            return
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.send_response(400)
+            self.end_headers()
+            return
+
+        event = payload.get("webhookEvent")
+        issue = payload.get("issue")
+        if event in WEBHOOK_EVENTS and issue and issue.get("key"):
+            receiver.events.put((event, issue))
+            receiver.received += 1
+
+        self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WebhookReceiver:
+    def __init__(self, host, port, path, secret):
+        if not secret:
+            raise ValueError("A webhook receiver needs a secret")
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret
+        self.events = queue.Queue()
+        self.received = 0
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), WebhookHandler)
+        self.server.receiver = self
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="jira-webhook", daemon=True
+        )
+        self.thread.start()
+        print(f"Listening for Jira webhooks on {self.host}:{self.port}{self.path}")
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def next_event(self, timeout=None):
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
@@ -0,0 +1,126 @@
+# **********************************************************
+# * CATEGORY  SOFTWARE
+# * GROUP     ADMIN
+# * AUTHOR    LANCE HAYNIE <LHAYNIE@SCCITY.ORG>
+# **********************************************************
+# Jira/Motion Bidirectional Syncing
+# Copyright Santa Clara City
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.#
+# You may obtain a copy of the License at
+# http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import time
+from datetime import datetime
+
+PRIORITY_CLASSES = ["ASAP", "High", "Medium", "Low"]
+
+
+def priority_class(priority):
+    priority = (priority or "Medium").capitalize()
+    if priority == "Asap":
+        return "ASAP"
+    return priority if priority in PRIORITY_CLASSES else "Medium"
+
+
+def days_until(duedate):
+    if not duedate:
+        return None
+    try:
+        due = datetime.strptime(duedate[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+    return (due - datetime.now()).total_seconds() / 86400
+
+
+class WriteItem:
+    __slots__ = ("kind", "key", "priority", "duedate", "call", "context", "queued_at")
+
+    def __init__(self, kind, key, priority, duedate, call, context, queued_at):
+        self.kind = kind
+        self.key = key
+        self.priority = priority_class(priority)
+        self.duedate = duedate
+        self.call = call
+        self.context = context
+        self.queued_at = queued_at
+
+    def urgency(self, now):
+        # Lower is more urgent, measured in hours. Each priority class is a day
+        # apart, a due date pulls an item forward by up to a month (overdue ones
+        # further), and waiting time is subtracted so low priorities still drain.
+        score = PRIORITY_CLASSES.index(self.priority) * 24.0
+        days = days_until(self.duedate)
+        score += max(-7.0, min(30.0, days if days is not None else 30.0)) * 2
+        score -= (now - self.queued_at) / 3600
+        return score
+
+
+class WriteQueue:
+    def __init__(self):
+        self.items = {}
+        self.served_waits = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def push(self, kind, key, priority, duedate, call, context=None, queued_at=None):
+        existing = self.items.get((kind, key))
+        if existing is not None:
+            queued_at = existing.queued_at
+        elif queued_at is None:
+            queued_at = time.time()
+        self.items[(kind, key)] = WriteItem(
+            kind, key, priority, duedate, call, context, queued_at
+        )
+
+    def discard(self, kind, key):
+        self.items.pop((kind, key), None)
+
+    def retain(self, kind, keys):
+        for item_kind, key in list(self.items):
+            if item_kind == kind and key not in keys:
+                del self.items[(item_kind, key)]
+
+    def take(self, limit):
+        now = time.time()
+        ordered = sorted(self.items.values(), key=lambda item: item.urgency(now))
+        batch = ordered[: max(0, limit)]
+
+        self.served_waits = {}
+        for item in batch:
+            del self.items[(item.kind, item.key)]
+            self.served_waits.setdefault(item.priority, []).append(now - item.queued_at)
+        return batch
+
+    def stats(self):
+        now = time.time()
+        stats = {}
+        for priority in PRIORITY_CLASSES:
+            waits = [
+                now - item.queued_at
+                for item in self.items.values()
+                if item.priority == priority
+            ]
+            served = self.served_waits.get(priority, [])
+            stats[priority] = {
+                "depth": len(waits),
+                "oldest_wait": max(waits) if waits else 0.0,
+                "served": len(served),
+                "served_wait": sum(served) / len(served) if served else 0.0,
+            }
+        return stats
+
+    def report(self):
+        for priority, stats in self.stats().items():
+            if not stats["depth"] and not stats["served"]:
+                continue
+            print(
+                f"Write queue {priority}: {stats['served']} written "
+                f"(avg wait {stats['served_wait']:.0f}s), {stats['depth']} waiting "
+                f"(oldest {stats['oldest_wait']:.0f}s)"
+            )